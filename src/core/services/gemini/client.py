@@ -77,7 +77,7 @@ class GeminiClient:
             content = Content(
                 role="user",
                 parts=[
-                    Part.from_text(prompt),
+                    Part.from_text(text=prompt),
                     image_part
                 ]
             )
@@ -149,7 +149,7 @@ class GeminiClient:
             # Create content with text
             content = Content(
                 role="user",
-                parts=[Part.from_text(prompt)]
+                parts=[Part.from_text(text=prompt)]
             )
             
             response = self.client.models.generate_content(
@@ -185,7 +185,7 @@ class GeminiClient:
             try:
                 content = Content(
                     role="user",
-                    parts=[Part.from_text("Test connection - respond with 'OK'")]
+                    parts=[Part.from_text(text="Test connection - respond with 'OK'")]
                 )
                 
                 response = self.client.models.generate_content(
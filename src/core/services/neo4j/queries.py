@@ -5,6 +5,13 @@ Contains all database queries for drug information retrieval.
 
 from typing import Dict, Any
 
+# Index definitions backing the drug lookups (idempotent, run at startup)
+CREATE_INDEX_QUERIES = (
+    "CREATE INDEX drug_rxcui IF NOT EXISTS FOR (d:Drug) ON (d.rxcui)",
+    "CREATE INDEX ndc_code IF NOT EXISTS FOR (n:NDC) ON (n.ndc)",
+    "CREATE INDEX brand_name IF NOT EXISTS FOR (b:Brand) ON (b.name)",
+)
+
 # Health check and sample queries
 HEALTH_CHECK_QUERY = """
 MATCH (c:Concept)
@@ -24,29 +31,33 @@ RETURN d.rxcui as concept_id, d.name as drug_name
 LIMIT 1
 """
 
-DRUG_SEARCH_QUERY = """
-MATCH (d:Drug)
-WHERE toLower(d.name) CONTAINS toLower($drug_name)
-OPTIONAL MATCH (d)-[:HAS_NDC]->(n:NDC)
-OPTIONAL MATCH (d)-[:HAS_SCHEDULE]->(sch:Schedule)
-OPTIONAL MATCH (d)-[:HAS_BRAND]->(b:Brand)
+DRUG_SEARCH_BATCH_QUERY = """
+UNWIND $terms AS term
+CALL {
+    WITH term
+    MATCH (d:Drug)
+    WHERE toLower(d.name) CONTAINS toLower(term)
+    WITH DISTINCT d, term
+    ORDER BY 
+        CASE WHEN toLower(d.name) = toLower(term) THEN 0 
+                WHEN toLower(d.name) STARTS WITH toLower(term) THEN 1
+                ELSE 2 END,
+        d.name
+    LIMIT $limit
+    RETURN d,
+        head([(d)-[:HAS_NDC]->(n:NDC) | n.ndc]) as ndc,
+        head([(d)-[:HAS_SCHEDULE]->(sch:Schedule) | sch.schedule]) as drug_schedule,
+        head([(d)-[:HAS_BRAND]->(b:Brand) | b]) as b
+}
 RETURN 
+    term,
     d.rxcui as concept_id, 
     d.name as concept_name,
     d.name as drug_name,
-    n.ndc as ndc,
-    sch.schedule as drug_schedule,
+    ndc,
+    drug_schedule,
     b.name as brand_drug,
     b.ndc as brand_ndc
-ORDER BY d.name
-LIMIT $limit
-"""
-
-EXACT_DRUG_MATCH_QUERY = """
-MATCH (d:Drug)
-WHERE toLower(d.name) = toLower($drug_name)
-RETURN d.rxcui as concept_id, d.name as drug_name
-LIMIT 1
 """
 
 DRUG_DETAILS_QUERY = """
@@ -5,21 +5,50 @@ Provides drug information retrieval and health monitoring.
 
 import asyncio
 from typing import Dict, Any, List, Optional
-from neo4j import AsyncGraphDatabase
+from neo4j import AsyncGraphDatabase, AsyncSession
 from src.core.settings.config import settings
 from src.core.settings.logging import logger
 from .queries import (
+    CREATE_INDEX_QUERIES,
     HEALTH_CHECK_QUERY,
     SAMPLE_DRUG_QUERY,
-    DRUG_SEARCH_QUERY,
-    EXACT_DRUG_MATCH_QUERY,
+    DRUG_SEARCH_BATCH_QUERY,
     DRUG_DETAILS_QUERY,
-    NDC_LOOKUP_QUERY,
     FLEXIBLE_QUERY,
     FUZZY_QUERY,
 )
 
 
+# Common OCR corrections for medical abbreviations and units, stored
+# pre-lowercased as (error, correction) pairs in application order.
+# Unit spellings that only differed by case (tsp, mg, ml, ...) are no-ops
+# once the name is lowercased, so they are not listed.
+_OCR_CORRECTIONS = (
+    # Units and measurements
+    ("t3p", "tsp"),      # teaspoon (common OCR error)
+    
+    # Common OCR character confusions
+    ("0", "o"),          # zero vs letter O
+    ("1", "i"),          # one vs letter I
+    ("5", "s"),          # five vs letter S
+    ("8", "b"),          # eight vs letter B
+    ("6", "g"),          # six vs letter G
+    ("rn", "m"),         # common OCR error
+    ("ii", "11"),        # roman numeral confusion
+    ("iii", "111"),      # roman numeral confusion
+    
+    # Drug name corrections
+    ("proveritil", "proventil"),
+    ("pulmicart", "pulmicort"),
+    ("claratin", "claritin"),
+    ("singuliar", "singulair"),
+)
+
+
+# Optional drug search columns copied onto results only when present
+_OPTIONAL_DRUG_FIELDS = ("ndc", "drug_schedule", "brand_drug", "brand_ndc")
+
+
 class RxNormService:
     """Service for RxNorm Knowledge Graph operations"""
     
@@ -36,17 +65,29 @@ class RxNormService:
                 auth=(settings.neo4j_user, settings.neo4j_password),
                 max_connection_lifetime=settings.neo4j_max_connection_lifetime,
                 max_connection_pool_size=settings.neo4j_max_connections,
+                connection_acquisition_timeout=settings.neo4j_connection_acquisition_timeout,
                 connection_timeout=settings.neo4j_connection_timeout
             )
             logger.info("Neo4j RxNorm driver initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize Neo4j driver: {e}")
+            logger.error("Failed to initialize Neo4j driver: %s", e)
             raise
     
+    async def ensure_indexes(self) -> None:
+        """Create the indexes used by the drug lookups if they do not exist yet"""
+        try:
+            async with self.driver.session(database=settings.neo4j_database) as session:
+                for query in CREATE_INDEX_QUERIES:
+                    await session.run(query)
+            logger.info("Neo4j RxNorm indexes ensured")
+        except Exception as e:
+            # Missing schema privileges should not prevent the service from starting
+            logger.warning("Could not ensure Neo4j RxNorm indexes: %s", e)
+    
     async def test_connection(self) -> Dict[str, Any]:
         """Test Neo4j connection and RxNorm data availability"""
         try:
-            async with self.driver.session() as session:
+            async with self.driver.session(database=settings.neo4j_database) as session:
                 # Test basic connection
                 result = await session.run("RETURN 1 as test")
                 record = await result.single()
@@ -110,7 +151,7 @@ class RxNormService:
                 }
                 
         except Exception as e:
-            logger.error(f"Neo4j connection test failed: {e}")
+            logger.error("Neo4j connection test failed: %s", e)
             return {
                 "connected": False,
                 "error": str(e)
@@ -119,143 +160,117 @@ class RxNormService:
     async def search_drug(self, drug_name: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for drugs by name with fuzzy matching and OCR correction"""
         try:
-            logger.info(f"🔍 Searching for drug: '{drug_name}'")
+            logger.info("🔍 Searching for drug: '%s'", drug_name)
             
-            # First try exact search
-            drugs = await self._exact_drug_search(drug_name, limit)
+            original_name = drug_name.lower()
+            corrected_name = self._apply_ocr_corrections(original_name)
             
-            # If no results, try fuzzy search with OCR corrections
-            if not drugs:
-                logger.info(f"No exact match found, trying OCR corrections and fuzzy search for '{drug_name}'")
-                drugs = await self._fuzzy_drug_search(drug_name, limit)
+            # One session serves both the batched name search and the fuzzy fallback
+            async with self.driver.session(database=settings.neo4j_database) as session:
+                # Search the original and OCR-corrected names in a single round trip
+                terms = [original_name]
+                if corrected_name != original_name:
+                    terms.append(corrected_name)
+                matches = await self._batch_drug_search(session, terms, limit)
+                
+                # Prefer exact name matches over OCR-corrected ones
+                drugs = matches.get(original_name, [])
+                if not drugs and corrected_name != original_name:
+                    logger.info("🔧 Applied OCR correction: '%s' -> '%s'", drug_name, corrected_name)
+                    drugs = matches.get(corrected_name, [])
+                    if drugs:
+                        logger.info("✅ Found matches with OCR correction")
+                
+                # If no results, fall back to fuzzy partial matching
+                if not drugs:
+                    logger.info("No exact match found, trying fuzzy search for '%s'", drug_name)
+                    drugs = await self._fuzzy_drug_search(session, original_name, limit)
             
             if drugs:
-                logger.info(f"✅ Found {len(drugs)} drug matches for '{drug_name}'")
+                logger.info("✅ Found %d drug matches for '%s'", len(drugs), drug_name)
             else:
-                logger.warning(f"❌ No matches found for '{drug_name}' even with fuzzy search")
+                logger.warning("❌ No matches found for '%s' even with fuzzy search", drug_name)
             
             return drugs
                 
         except Exception as e:
-            logger.error(f"Drug search failed: {e}")
+            logger.error("Drug search failed: %s", e)
             return []
 
-    async def _exact_drug_search(self, drug_name: str, limit: int) -> List[Dict[str, Any]]:
-        """Exact drug name search"""
+    @staticmethod
+    def _apply_ocr_corrections(drug_name: str) -> str:
+        """Apply common OCR corrections to a lowercased drug name"""
+        corrected_name = drug_name
+        for error, correction in _OCR_CORRECTIONS:
+            corrected_name = corrected_name.replace(error, correction)
+        return corrected_name
+
+    @staticmethod
+    def _record_to_drug(record) -> Dict[str, Any]:
+        """Shape a drug search record, keeping only the optional fields that are set"""
+        drug_name = record["drug_name"]
+        drug_record = {
+            "concept_id": record["concept_id"],
+            "concept_name": record.get("concept_name", drug_name),
+            "drug_name": drug_name
+        }
+        drug_record.update(
+            (field, value) for field in _OPTIONAL_DRUG_FIELDS
+            if (value := record.get(field))
+        )
+        return drug_record
+
+    async def _batch_drug_search(
+        self, session: AsyncSession, terms: List[str], limit: int
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Drug name search for several terms in one query, grouped by term"""
         try:
-            async with self.driver.session() as session:
-                result = await session.run(
-                    DRUG_SEARCH_QUERY,
-                    drug_name=drug_name,
-                    limit=limit
-                )
-                
-                drugs = []
-                async for record in result:
-                    drug_record = {
-                        "concept_id": record["concept_id"],
-                        "concept_name": record.get("concept_name", record.get("drug_name", "")),
-                        "drug_name": record["drug_name"]
-                    }
-                    # Add additional fields if available
-                    for field in ["ndc", "drug_schedule", "brand_drug", "brand_ndc"]:
-                        if record.get(field):
-                            drug_record[field] = record[field]
-                    drugs.append(drug_record)
-                
-                return drugs
+            result = await session.run(
+                DRUG_SEARCH_BATCH_QUERY,
+                terms=terms,
+                limit=limit
+            )
+            
+            matches: Dict[str, List[Dict[str, Any]]] = {}
+            async for record in result:
+                matches.setdefault(record["term"], []).append(self._record_to_drug(record))
+            
+            return matches
         except Exception as e:
-            logger.error(f"Exact drug search failed: {e}")
-            return []
+            logger.error("Batch drug search failed: %s", e)
+            return {}
 
-    async def _fuzzy_drug_search(self, drug_name: str, limit: int) -> List[Dict[str, Any]]:
-        """Fuzzy search with OCR error corrections for medical abbreviations"""
+    async def _fuzzy_drug_search(self, session: AsyncSession, drug_name: str, limit: int) -> List[Dict[str, Any]]:
+        """Fuzzy partial-match search for a lowercased drug name"""
         try:
-            # Common OCR corrections for medical abbreviations and units
-            ocr_corrections = {
-                # Units and measurements
-                "t3p": "TSP",      # teaspoon (common OCR error)
-                "tsp": "TSP",      # teaspoon
-                "tbsp": "TBSP",    # tablespoon
-                "ml": "ML",        # milliliter
-                "mg": "MG",        # milligram
-                "mcg": "MCG",      # microgram
-                "gm": "GM",        # gram
-                "kg": "KG",        # kilogram
-                "iu": "IU",        # international unit
-                
-                # Common OCR character confusions
-                "0": "O",          # zero vs letter O
-                "1": "I",          # one vs letter I  
-                "5": "S",          # five vs letter S
-                "8": "B",          # eight vs letter B
-                "6": "G",          # six vs letter G
-                "rn": "m",         # common OCR error
-                "ii": "11",        # roman numeral confusion
-                "iii": "111",      # roman numeral confusion
-                
-                # Drug name corrections
-                "proveritil": "proventil",
-                "pulmicart": "pulmicort",
-                "claratin": "claritin",
-                "singuliar": "singulair"
-            }
-            
-            # Apply OCR corrections
-            corrected_name = drug_name.lower()
-            original_name = corrected_name
+            # Try partial matching with CONTAINS
+            logger.info("🔍 Trying fuzzy search with partial matching")
             
-            for error, correction in ocr_corrections.items():
-                corrected_name = corrected_name.replace(error.lower(), correction.lower())
+            # Create regex pattern for fuzzy matching
+            pattern = f".*{drug_name.replace(' ', '.*')}.*"
             
-            # If we made corrections, try searching with corrected name
-            if corrected_name != original_name:
-                logger.info(f"🔧 Applied OCR correction: '{drug_name}' -> '{corrected_name}'")
-                drugs = await self._exact_drug_search(corrected_name, limit)
-                if drugs:
-                    logger.info(f"✅ Found matches with OCR correction")
-                    return drugs
+            result = await session.run(
+                FUZZY_QUERY,
+                drug_name=drug_name,
+                pattern=pattern,
+                limit=limit
+            )
             
-            # Try partial matching with CONTAINS
-            logger.info(f"🔍 Trying fuzzy search with partial matching")
+            drugs = [self._record_to_drug(record) async for record in result]
             
-            # Create regex pattern for fuzzy matching
-            pattern = f".*{drug_name.lower().replace(' ', '.*')}.*"
+            if drugs:
+                logger.info("✅ Fuzzy search found %d matches", len(drugs))
             
-            async with self.driver.session() as session:
-                result = await session.run(
-                    FUZZY_QUERY,
-                    drug_name=drug_name.lower(),
-                    pattern=pattern,
-                    limit=limit
-                )
-                
-                drugs = []
-                async for record in result:
-                    drug_record = {
-                        "concept_id": record["concept_id"],
-                        "concept_name": record.get("concept_name", record.get("drug_name", "")),
-                        "drug_name": record["drug_name"]
-                    }
-                    # Add additional fields if available
-                    for field in ["ndc", "drug_schedule", "brand_drug", "brand_ndc"]:
-                        if record.get(field):
-                            drug_record[field] = record[field]
-                    drugs.append(drug_record)
-                
-                if drugs:
-                    logger.info(f"✅ Fuzzy search found {len(drugs)} matches")
-                
-                return drugs
+            return drugs
                 
         except Exception as e:
-            logger.error(f"Fuzzy drug search failed: {e}")
+            logger.error("Fuzzy drug search failed: %s", e)
             return []
     
     async def get_drug_details(self, concept_id: str) -> Dict[str, Any]:
         """Get detailed drug information by concept ID"""
         try:
-            async with self.driver.session() as session:
+            async with self.driver.session(database=settings.neo4j_database) as session:
                 result = await session.run(
                     DRUG_DETAILS_QUERY,
                     concept_id=concept_id
@@ -270,7 +285,7 @@ class RxNormService:
                 return details
                     
         except Exception as e:
-            logger.error(f"Drug details retrieval failed: {e}")
+            logger.error("Drug details retrieval failed: %s", e)
             return {}
     
     
@@ -297,9 +312,9 @@ class RxNormService:
             List of drug information dictionaries
         """
         try:
-            logger.info(f"Searching RxNorm for drug: {drug_name} with strength: {strength}")
+            logger.info("Searching RxNorm for drug: %s with strength: %s", drug_name, strength)
             
-            async with self.driver.session() as session:
+            async with self.driver.session(database=settings.neo4j_database) as session:
                 
                 result = await session.run(
                     FLEXIBLE_QUERY,
@@ -324,14 +339,14 @@ class RxNormService:
                         })
                 
                 if results:
-                    logger.info(f"Found {len(results)} results for {drug_name}")
+                    logger.info("Found %d results for %s", len(results), drug_name)
                 else:
-                    logger.warning(f"No results found for {drug_name}")
+                    logger.warning("No results found for %s", drug_name)
                 
                 return results
                 
         except Exception as e:
-            logger.error(f"Error querying RxNorm for {drug_name}: {e}")
+            logger.error("Error querying RxNorm for %s: %s", drug_name, e)
             return []
 
     async def close(self):
@@ -30,8 +30,14 @@ class Settings(BaseSettings):
     gemini_model_primary: str = Field(default="gemini-1.5-pro-latest", description="Primary Gemini model")
     gemini_model_secondary: str = Field(default="gemini-1.5-flash-latest", description="Secondary Gemini model")
     gemini_model_fallback: str = Field(default="gemini-1.0-pro-latest", description="Fallback Gemini model")
+    instructions_model: str = Field(default="gemini-2.5-flash-lite", description="Gemini model for structured medication instruction generation")
     gemini_temperature: float = Field(default=0.0, description="Gemini model temperature")
     gemini_max_tokens: int = Field(default=8192, description="Gemini max output tokens")
+    gemini_concurrency: int = Field(default=5, description="Maximum concurrent Gemini image extractions in a batch")
+    gemini_batch_poll_seconds: int = Field(default=30, description="Polling interval for Gemini Batch API extraction jobs in seconds")
+    gemini_retry_attempts: int = Field(default=3, description="Attempts per Gemini extraction call on transient errors (timeouts, 429, 5xx)")
+    image_extraction_cache_size: int = Field(default=256, description="Maximum number of cached Gemini image extraction responses")
+    image_extraction_cache_ttl_seconds: int = Field(default=3600, description="Time-to-live of cached Gemini image extraction responses in seconds")
     
     # =============================================================================
     # Neo4j Configuration (RxNorm KG)
@@ -43,6 +49,15 @@ class Settings(BaseSettings):
     neo4j_max_connection_lifetime: int = Field(default=30, description="Neo4j max connection lifetime in seconds")
     neo4j_max_connections: int = Field(default=50, description="Neo4j max connection pool size")
     neo4j_connection_timeout: int = Field(default=30, description="Neo4j connection timeout in seconds")
+    neo4j_connection_acquisition_timeout: int = Field(default=30, description="Max seconds to wait for a free connection from the Neo4j pool")
+    rxnorm_lookup_timeout: float = Field(default=5.0, description="Timeout for a single RxNorm knowledge graph query in seconds")
+    rxnorm_breaker_fail_max: int = Field(default=10, description="Consecutive RxNorm lookup failures before the circuit breaker opens")
+    rxnorm_breaker_reset_seconds: int = Field(default=30, description="Seconds the RxNorm circuit breaker stays open before retrying")
+    rxnorm_cache_size: int = Field(default=4096, description="Maximum number of cached RxNorm lookups")
+    rxnorm_cache_ttl_seconds: int = Field(default=600, description="Time-to-live of cached RxNorm lookups in seconds")
+    redis_url: Optional[str] = Field(default=None, description="Redis URL for the RxNorm lookup cache shared across workers (disabled when unset)")
+    rxnorm_shared_cache_ttl_seconds: int = Field(default=3600, description="Time-to-live of RxNorm lookups in the shared Redis cache in seconds")
+    redis_timeout_seconds: float = Field(default=0.5, description="Connect and socket timeout for the shared Redis cache; a slow Redis counts as a cache miss")
     
     # =============================================================================
     # Image Processing Configuration
@@ -50,6 +65,8 @@ class Settings(BaseSettings):
     max_image_size_mb: int = Field(default=10, description="Maximum image size in MB")
     supported_image_formats: str = Field(default="jpg,jpeg,png,pdf", description="Supported image formats (comma-separated)")
     image_processing_timeout: int = Field(default=30, description="Image processing timeout in seconds")
+    image_upload_max_edge: int = Field(default=2048, description="Longest image edge in pixels sent to Gemini; larger images are downscaled")
+    image_upload_jpeg_quality: int = Field(default=85, description="JPEG quality used when re-encoding images sent to Gemini")
     
     # =============================================================================
     # Agent Configuration
@@ -57,6 +74,15 @@ class Settings(BaseSettings):
     max_agent_retries: int = Field(default=3, description="Maximum agent retry attempts")
     agent_timeout_seconds: int = Field(default=60, description="Agent timeout in seconds")
     json_repair_enabled: bool = Field(default=True, description="Enable JSON repair functionality")
+    medication_max_concurrency: int = Field(default=5, description="Maximum medications processed concurrently per prescription")
+    hallucination_cache_size: int = Field(default=1024, description="Maximum number of cached hallucination-check responses")
+    hallucination_cache_ttl_seconds: int = Field(default=600, description="Time-to-live of cached hallucination-check responses in seconds")
+    hallucination_plausibility_chunk_size: int = Field(default=25, description="Medications per Gemini medical-plausibility prompt; larger lists are checked in concurrent chunks that each see the full medication name list")
+    hallucination_llm_min_certainty: int = Field(default=90, description="Minimum certainty at which a prescription with no local issues skips the Gemini hallucination checks")
+    spanish_translation_cache_size: int = Field(default=2048, description="Maximum number of cached English-to-Spanish SIG translations")
+    instructions_cache_size: int = Field(default=1024, description="Maximum number of cached structured-instruction results")
+    instructions_cache_ttl_seconds: int = Field(default=3600, description="Time-to-live of cached structured-instruction results in seconds")
+    spanish_translation_cache_ttl_seconds: int = Field(default=86400, description="Time-to-live of cached Spanish SIG translations in seconds")
 
     # =============================================================================
     # LangFuse Configuration (Observability)
@@ -11,6 +11,7 @@ from fastapi.responses import JSONResponse
 
 from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.core.services.neo4j.rxnorm_rag_service import rxnorm_service
 
 # Import only the essential routers
 from src.modules.system_health_management.router import router as health_router
@@ -22,6 +23,7 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info("Starting Medical Prescription AI APIs")
+    await rxnorm_service.ensure_indexes()
     logger.info("All services initialized successfully")
     
     yield
@@ -6,9 +6,8 @@ Refactored to use prompts.py and tools.py structure
 
 import logging
 from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from src.core.settings.config import settings
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 from .prompts import (
     get_medication_safety_assessment_prompt,
     get_drug_interaction_check_prompt,
@@ -43,12 +42,7 @@ class ClinicalSafetyAgent:
         """Initialize the Clinical Safety Agent"""
         try:
             # Initialize Gemini 2.5 Pro model
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-pro",
-                temperature=0,
-                max_output_tokens=4096,
-                google_api_key=settings.google_api_key
-            )
+            self.llm = get_gemini_llm("gemini-2.5-pro", max_output_tokens=4096)
             
             logger.info("✅ Clinical Safety Agent initialized with Gemini 2.5 Pro")
             
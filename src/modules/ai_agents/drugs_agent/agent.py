@@ -3,12 +3,13 @@ Drugs Agent - Medication processing with RxNorm mapping using Gemini 2.5 Pro
 Processes medications and enriches them with RxNorm data
 """
 
-from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from typing import Dict, Any, List, Optional
 from langchain_core.messages import HumanMessage
 
 from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 
 # Optional LangFuse import
 try:
@@ -26,6 +27,7 @@ from .prompts import (
 )
 from .tools import (
     get_rxnorm_drug_info,
+    get_rxnorm_many,
     calculate_quantity_from_sig,
     infer_days_from_quantity,
     validate_medication_data,
@@ -43,11 +45,7 @@ class DrugsAgent:
     
     def __init__(self):
         """Initialize the drugs agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
         
         # Initialize instruction agents
         self.instructions_agent = InstructionsOfUseAgent()
@@ -73,40 +71,54 @@ class DrugsAgent:
             logger.warning("No medications found to process")
             return self._add_warning(state, "No medications found to process")
         
-        processed_medications = []
-        quality_warnings = state.get("quality_warnings", [])
-        
-        logger.info(f"Processing {len(medications_to_process)} medications")
-        
-        for medication in medications_to_process:
-            try:
-                drug_name = medication.get('drug_name', 'unknown')
-                logger.info(f"\nProcessing Medication: {drug_name}")
-                
-                processed_med = await self.process_single_medication(medication)
-                processed_medications.append(processed_med)
-                
-                logger.info(f"Successfully processed medication: {drug_name}")
-                
-            except Exception as e:
-                error_msg = f"Failed to process medication {medication.get('drug_name', 'unknown')}: {str(e)}"
-                logger.error(error_msg)
-                quality_warnings.append(error_msg)
-                # Add original medication if processing fails
-                processed_medications.append(medication)
-        
-        return {
-            **state,
-            "processed_medications": processed_medications,
-            "quality_warnings": quality_warnings
-        }
+        logger.info("Processing %d medications", len(medications_to_process))
+        
+        # Resolve RxNorm data for all medications concurrently up front, unless the
+        # orchestrator already prefetched it while the earlier steps ran
+        rxnorm_results = state.pop("rxnorm_prefetch_results", None)
+        if rxnorm_results is None or len(rxnorm_results) != len(medications_to_process):
+            rxnorm_results = await get_rxnorm_many(medications_to_process)
+        
+        # Process every medication, but only a bounded number at a time
+        semaphore = asyncio.Semaphore(settings.medication_max_concurrency)
+        
+        async def _process(medication: Dict[str, Any], rxnorm_data: Dict[str, Any]) -> Dict[str, Any]:
+            drug_name = medication.get('drug_name', 'unknown')
+            async with semaphore:
+                try:
+                    logger.info("\nProcessing Medication: %s", drug_name)
+                    
+                    processed_med = await self.process_single_medication(medication, rxnorm_data)
+                    
+                    logger.info("Successfully processed medication: %s", drug_name)
+                    return processed_med
+                    
+                except Exception as e:
+                    error_msg = f"Failed to process medication {drug_name}: {str(e)}"
+                    logger.error(error_msg)
+                    state.setdefault("quality_warnings", []).append(error_msg)
+                    # Add original medication if processing fails
+                    return medication
+        
+        processed_medications = await asyncio.gather(*(
+            _process(medication, rxnorm_data)
+            for medication, rxnorm_data in zip(medications_to_process, rxnorm_results)
+        ))
+        
+        state["processed_medications"] = processed_medications
+        return state
     
-    async def process_single_medication(self, medication: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_single_medication(
+        self,
+        medication: Dict[str, Any],
+        rxnorm_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Process a single medication with full enhancement
         
         Args:
             medication: Medication data to process
+            rxnorm_data: Pre-fetched RxNorm information (looked up if omitted)
             
         Returns:
             Enhanced medication data
@@ -115,17 +127,19 @@ class DrugsAgent:
         if not drug_name:
             return medication
         
-        enhanced_med = medication.copy()
-        
         # Step 1: Get RxNorm information first for clinical context
-        rxnorm_data = await get_rxnorm_drug_info(drug_name, enhanced_med.get("strength"))
+        if rxnorm_data is None:
+            rxnorm_data = await get_rxnorm_drug_info(drug_name, medication.get("strength"))
+        
+        # Single copy of the input medication, merged in place with the RxNorm fields
+        enhanced_med = dict(medication)
         enhanced_med.update(rxnorm_data)
         
         # Step 2: Generate structured instructions with RxNorm safety validation
         if enhanced_med.get("instructions_for_use"):
             try:
-                logger.info(f"🏥 Generating structured instructions for {drug_name}")
-                logger.info(f"📝 Raw instructions: '{enhanced_med['instructions_for_use']}'")
+                logger.info("🏥 Generating structured instructions for %s", drug_name)
+                logger.info("📝 Raw instructions: '%s'", enhanced_med['instructions_for_use'])
                 
                 instruction_result = await self.instructions_agent.generate_structured_instructions(
                     drug_name=drug_name,
@@ -134,36 +148,35 @@ class DrugsAgent:
                     indication=enhanced_med.get("indication")
                 )
                 
-                logger.info(f"✅ Instruction generation completed for {drug_name}")
+                logger.info("✅ Instruction generation completed for %s", drug_name)
                 
                 # Update medication with structured instruction data
                 if instruction_result.get("structured_instructions"):
                     enhanced_med["structured_instructions"] = instruction_result["structured_instructions"]
-                    logger.info(f"📋 Added structured instructions for {drug_name}")
+                    logger.info("📋 Added structured instructions for %s", drug_name)
                 
                 if instruction_result.get("sig_english"):
                     enhanced_med["sig_english"] = instruction_result["sig_english"]
-                    logger.info(f"🇺🇸 Added English sig: {instruction_result['sig_english']}")
+                    logger.info("🇺🇸 Added English sig: %s", instruction_result['sig_english'])
                 
                 if instruction_result.get("sig_spanish"):
                     enhanced_med["sig_spanish"] = instruction_result["sig_spanish"]
-                    logger.info(f"🇪🇸 Added Spanish sig: {instruction_result['sig_spanish']}")
+                    logger.info("🇪🇸 Added Spanish sig: %s", instruction_result['sig_spanish'])
                 
                 # Add safety validation results
                 if instruction_result.get("safety_validation"):
                     enhanced_med["instruction_safety"] = instruction_result["safety_validation"]
-                    logger.info(f"🛡️ Added safety validation for {drug_name}")
+                    logger.info("🛡️ Added safety validation for %s", drug_name)
                 
             except Exception as e:
-                logger.error(f"❌ Instruction generation failed for {drug_name}: {e}")
+                logger.error("❌ Instruction generation failed for %s: %s", drug_name, e)
                 # Fallback to simple sig generation
-                if enhanced_med.get("instructions_for_use"):
-                    enhanced_med["sig_english"] = generate_sig_english(enhanced_med["instructions_for_use"])
-                    logger.info(f"🔄 Used fallback sig generation for {drug_name}")
+                enhanced_med["sig_english"] = generate_sig_english(enhanced_med["instructions_for_use"])
+                logger.info("🔄 Used fallback sig generation for %s", drug_name)
         
         # Step 3: Validate generated instructions
         if enhanced_med.get("structured_instructions"):
-            logger.info(f"🔍 Validating instructions for {drug_name}")
+            logger.info("🔍 Validating instructions for %s", drug_name)
             validation_result = await self.validation_agent.validate_medication_instructions(
                 instruction_data={
                     "drug_name": drug_name,
@@ -204,7 +217,7 @@ class DrugsAgent:
         # Step 6: Validate and clean the medication data
         is_valid, warnings, cleaned_med = validate_medication_data(enhanced_med)
         if warnings:
-            logger.warning(f"Medication validation warnings for {drug_name}: {warnings}")
+            logger.warning("Medication validation warnings for %s: %s", drug_name, warnings)
         
         return cleaned_med
     
@@ -224,9 +237,5 @@ class DrugsAgent:
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
         """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
\ No newline at end of file
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
\ No newline at end of file
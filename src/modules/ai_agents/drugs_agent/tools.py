@@ -3,105 +3,475 @@ Drugs Agent Tools
 Contains tools for medication processing including RxNorm integration
 """
 
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Mapping, Optional, Tuple, List
+from types import MappingProxyType
 import asyncio
+import re
+import time
+import hashlib
+from functools import lru_cache
+from itertools import islice
+import orjson
 from src.modules.ai_agents.utils.json_parser import parse_json
+from src.modules.ai_agents.utils.ttl_cache import TTLCache
 from src.core.services.neo4j.rxnorm_rag_service import rxnorm_service
+from src.core.settings.config import settings
 from src.core.settings.logging import logger
 from langfuse import observe
 
+# Optional Redis client for the cross-worker RxNorm cache
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None
 
-@observe(name="rxnorm_drug_lookup_enhanced", as_type="generation", capture_input=True, capture_output=True)
-async def get_rxnorm_drug_info(drug_name: str, strength: str = None) -> Dict[str, Any]:
+
+# Empty RxNorm result returned when a drug is not found or the lookup fails
+_EMPTY_RXNORM_RESULT = MappingProxyType({
+    "rxcui": None,
+    "ndc": None,
+    "drug_schedule": None,
+    "brand_drug": None,
+    "brand_ndc": None
+})
+
+# Shared knowledge graph lookup result for drugs without a usable match
+_NO_RXNORM_MATCH = MappingProxyType({"match": None, "details": MappingProxyType({})})
+
+
+# Common sig abbreviation mappings used by generate_sig_english
+_SIG_MAPPINGS = MappingProxyType({
+    "po": "by mouth",
+    "bid": "twice daily",
+    "tid": "three times daily",
+    "qid": "four times daily",
+    "qd": "once daily",
+    "daily": "daily",
+    "prn": "as needed",
+    "ac": "before meals",
+    "pc": "after meals",
+    "hs": "at bedtime",
+    "q4h": "every 4 hours",
+    "q6h": "every 6 hours",
+    "q8h": "every 8 hours",
+    "q12h": "every 12 hours",
+    "gtt": "drop",
+    "gtts": "drops",
+    "ou": "both eyes",
+    "od": "right eye",
+    "os": "left eye",
+    "au": "both ears",
+    "ad": "right ear",
+    "as": "left ear"
+})
+
+# Whole-word matcher for the sig abbreviations, longest first so e.g. "gtts" wins over "gtt"
+_SIG_RE = re.compile(
+    r"\b(" + "|".join(re.escape(abbrev) for abbrev in sorted(_SIG_MAPPINGS, key=len, reverse=True)) + r")\b"
+)
+
+# Dosing frequency keywords (times per day) used by the quantity and days helpers
+_FREQ_MAP = MappingProxyType({
+    "twice": 2, "bid": 2, "b.i.d": 2,
+    "three times": 3, "tid": 3, "t.i.d": 3,
+    "four times": 4, "qid": 4, "q.i.d": 4,
+    "daily": 1, "qd": 1, "once": 1
+})
+_FREQ_RE = re.compile(
+    r"\b(" + "|".join(re.escape(keyword) for keyword in sorted(_FREQ_MAP, key=len, reverse=True)) + r")\b"
+)
+_NUM_RE = re.compile(r"\d+")
+
+# Fields every repaired medication dict carries, None when not extracted
+_EXPECTED_MEDICATION_FIELDS = (
+    "drug_name", "strength", "instructions_for_use", "quantity",
+    "infer_qty", "days_of_use", "infer_days", "refills", "certainty"
+)
+
+# Digit check used to validate strength and quantity values
+_HAS_DIGIT = re.compile(r"\d").search
+
+# Unit words that make a quantity without digits acceptable
+_VALID_QUANTITY_UNITS = ("tabs", "capsules", "ml", "bottles", "tubes", "g", "mg", "units")
+
+# Keyword groups used to pick an action verb for the English sig, each
+# compiled into one substring alternation so a group is a single scan
+_SIG_ACTION_VERB_RE = re.compile("take|apply|instill|use|insert")
+_SIG_INSTILL_RE = re.compile("drop|eye|ear")
+_SIG_APPLY_RE = re.compile("cream|ointment|gel|apply")
+
+# Dosage form keywords used to format a calculated quantity
+_DROP_FORM_RE = re.compile("drop|gtt")
+_TOPICAL_FORM_RE = re.compile("apply|cream|ointment|gel")
+
+
+class _CircuitBreaker:
     """
-    Get drug information from RxNorm Neo4j knowledge graph with comprehensive logging
+    Minimal circuit breaker for the RxNorm knowledge graph lookups.
+    
+    After ``fail_max`` consecutive failures the breaker opens and lookups are
+    short-circuited for ``reset_timeout`` seconds, after which a single trial
+    call is let through (half-open).
+    """
+    
+    def __init__(self, fail_max: int, reset_timeout: float):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # Start of the half-open trial call, while it is in flight
+        self._trial_started_at: Optional[float] = None
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether calls should currently be short-circuited"""
+        if self._opened_at is None:
+            return False
+        now = time.monotonic()
+        if self._trial_started_at is not None and now - self._trial_started_at < self.reset_timeout:
+            # A trial call is in flight; everyone else stays short-circuited
+            return True
+        if now - self._opened_at >= self.reset_timeout:
+            # Half-open: let this caller through as the single trial call (a trial
+            # that never reports back is replaced after another reset_timeout)
+            self._trial_started_at = now
+            return False
+        return True
+    
+    def record_success(self) -> None:
+        """Reset the failure count after a completed lookup"""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started_at = None
+    
+    def record_failure(self) -> None:
+        """Count a failed lookup and open the breaker past the threshold"""
+        self._failures += 1
+        self._trial_started_at = None
+        if self._failures >= self.fail_max:
+            self._opened_at = time.monotonic()
+
+
+_rxnorm_breaker = _CircuitBreaker(
+    fail_max=settings.rxnorm_breaker_fail_max,
+    reset_timeout=settings.rxnorm_breaker_reset_seconds
+)
+
+# Knowledge graph matches keyed by normalized (drug_name, strength); errors are not cached
+_rxnorm_cache = TTLCache(
+    maxsize=settings.rxnorm_cache_size,
+    ttl=settings.rxnorm_cache_ttl_seconds
+)
+
+
+# Shared cache-aside layer in front of the knowledge graph, so workers reuse each other's lookups
+_shared_rxnorm_cache = (
+    aioredis.from_url(
+        settings.redis_url,
+        socket_timeout=settings.redis_timeout_seconds,
+        socket_connect_timeout=settings.redis_timeout_seconds
+    )
+    if aioredis is not None and settings.redis_url
+    else None
+)
+
+# Prefix of every shared-cache key
+_SHARED_CACHE_PREFIX = "rxnorm:"
+
+_rxnorm_cache_stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+
+async def clear_rxnorm_cache() -> None:
+    """
+    Invalidate cached RxNorm lookups, e.g. after the knowledge graph was reloaded
+    
+    Clears this worker's cache and deletes the shared Redis entries, so other
+    workers stop reading stale lookups once their local entries expire.
+    """
+    _rxnorm_cache.clear()
+    if _shared_rxnorm_cache is None:
+        return
+    try:
+        batch = []
+        async for key in _shared_rxnorm_cache.scan_iter(match=_SHARED_CACHE_PREFIX + "*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await _shared_rxnorm_cache.delete(*batch)
+                batch.clear()
+        if batch:
+            await _shared_rxnorm_cache.delete(*batch)
+    except Exception as e:
+        logger.warning("Shared RxNorm cache clear failed: %s", e)
+
+
+def get_rxnorm_cache_stats() -> Dict[str, Any]:
+    """
+    Get RxNorm lookup cache statistics for this worker
+    
+    Returns:
+        Hit/miss counters, hit rate and cache configuration
+    """
+    lookups = sum(_rxnorm_cache_stats.values())
+    hits = _rxnorm_cache_stats["local_hits"] + _rxnorm_cache_stats["shared_hits"]
+    return {
+        **_rxnorm_cache_stats,
+        "hit_rate": hits / lookups if lookups else 0,
+        "local_size": len(_rxnorm_cache),
+        "shared_cache_enabled": _shared_rxnorm_cache is not None
+    }
+
+
+def _freeze_lookup(match: Optional[Dict[str, Any]], details: Dict[str, Any]) -> Mapping[str, Any]:
+    """Build the read-only lookup entry shared by every cache hit"""
+    if match is None:
+        return _NO_RXNORM_MATCH
+    return MappingProxyType({
+        "match": MappingProxyType(match),
+        "details": MappingProxyType(details)
+    })
+
+
+def _shared_cache_key(cache_key: Tuple[str, str]) -> str:
+    """Redis key for a canonical (drug_name, strength) lookup key"""
+    return _SHARED_CACHE_PREFIX + hashlib.sha1("|".join(cache_key).encode()).hexdigest()
+
+
+async def _shared_cache_get(cache_key: Tuple[str, str]) -> Optional[Mapping[str, Any]]:
+    """Read a lookup from the shared Redis cache; failures count as a miss"""
+    if _shared_rxnorm_cache is None:
+        return None
+    try:
+        raw = await _shared_rxnorm_cache.get(_shared_cache_key(cache_key))
+        if raw is None:
+            return None
+        data = orjson.loads(raw)
+        return _freeze_lookup(data["match"], data["details"])
+    except Exception as e:
+        logger.warning("Shared RxNorm cache read failed: %s", e)
+        return None
+
+
+async def _shared_cache_set(
+    cache_key: Tuple[str, str],
+    match: Optional[Dict[str, Any]],
+    details: Dict[str, Any]
+) -> None:
+    """Store a lookup in the shared Redis cache; failures are only logged"""
+    if _shared_rxnorm_cache is None:
+        return
+    try:
+        await _shared_rxnorm_cache.set(
+            _shared_cache_key(cache_key),
+            orjson.dumps({"match": match, "details": details}),
+            ex=settings.rxnorm_shared_cache_ttl_seconds
+        )
+    except Exception as e:
+        logger.warning("Shared RxNorm cache write failed: %s", e)
+
+
+async def lookup_rxnorm_match(drug_name: str, strength: str = None) -> Optional[Mapping[str, Any]]:
+    """
+    Resolve a drug against the RxNorm knowledge graph
+    
+    Only runs the knowledge graph search and detail lookup, bounded by a
+    timeout and the circuit breaker and memoized in a TTL cache, so agents
+    that need RxNorm data for the same medication share a single lookup.
+    When Redis is configured, lookups are also shared across workers.
     
     Args:
         drug_name: Name of the drug
         strength: Drug strength (optional)
         
     Returns:
-        Dictionary with RxNorm information
+        Dictionary with the best search "match" (None if not found) and its
+        "details" as read-only mappings, or None if the lookup failed
     """
-    logger.info(f"🔍 RXNORM LOOKUP START: Drug='{drug_name}', Strength='{strength or 'N/A'}'")
+    cache_key = (_canonicalize_term(drug_name), _canonicalize_term(strength))
+    cached = _rxnorm_cache.get(cache_key)
+    if cached is not None:
+        _rxnorm_cache_stats["local_hits"] += 1
+        logger.info("📦 RxNorm cache hit for '%s'", drug_name)
+        return cached
+    
+    cached = await _shared_cache_get(cache_key)
+    if cached is not None:
+        _rxnorm_cache_stats["shared_hits"] += 1
+        logger.info("📦 RxNorm shared cache hit for '%s'", drug_name)
+        _rxnorm_cache.set(cache_key, cached)
+        return cached
+    
+    _rxnorm_cache_stats["misses"] += 1
+    
+    if _rxnorm_breaker.is_open:
+        logger.warning("⛔ RxNorm circuit breaker open, skipping knowledge graph lookup for '%s'", drug_name)
+        return None
     
     try:
         # Log search initiation
-        logger.info(f"📊 Initiating RxNorm search in Neo4j knowledge graph")
+        logger.info("📊 Initiating RxNorm search in Neo4j knowledge graph")
         
         # Search for drug in RxNorm
-        search_results = await rxnorm_service.search_drug(drug_name, limit=5)
+        search_results = await asyncio.wait_for(
+            rxnorm_service.search_drug(drug_name, limit=5),
+            timeout=settings.rxnorm_lookup_timeout
+        )
         
-        logger.info(f"📋 RxNorm search returned {len(search_results) if search_results else 0} results")
+        logger.info("📋 RxNorm search returned %d results", len(search_results) if search_results else 0)
         
+        best_match = None
+        drug_details = {}
         if search_results:
             # Log all search results for transparency
             for i, result in enumerate(search_results[:3]):  # Log top 3
-                logger.info(f"🔸 Result {i+1}: {result.get('concept_name', 'N/A')} (ID: {result.get('concept_id', 'N/A')})")
+                logger.info("🔸 Result %d: %s (ID: %s)", i + 1, result.get('concept_name', 'N/A'), result.get('concept_id', 'N/A'))
             
-            # Use the first/best match
+            # Use the first/best match, unless the prescribed strength pins exactly one candidate
             best_match = search_results[0]
+            if strength:
+                strength_lower = strength.lower()
+                # Stop scanning at the second hit, since more than one hit means no pin
+                strength_matches = list(islice(
+                    (result for result in search_results
+                     if strength_lower in result.get("drug_name", "").lower()),
+                    2
+                ))
+                if len(strength_matches) == 1:
+                    best_match = strength_matches[0]
+                    logger.info("🎯 Strength '%s' pins candidate %s", strength, best_match.get("concept_id"))
             concept_id = best_match.get("concept_id")
-            concept_name = best_match.get("concept_name", drug_name)
             
             if concept_id:
-                logger.info(f"✅ RXNORM MATCH FOUND: Concept ID={concept_id}, Name='{concept_name}'")
-                
                 # Get detailed drug information
-                logger.info(f"📖 Fetching detailed drug information for concept {concept_id}")
-                drug_details = await rxnorm_service.get_drug_details(concept_id)
-                
-                # Log detailed information found
-                rxcui = str(concept_id)
-                ndc = drug_details.get("NDC")
-                drug_schedule = drug_details.get("DEA_SCHEDULE") 
-                brand_drug = drug_details.get("BRAND_NAME") or best_match.get("generic_name")
-                brand_ndc = drug_details.get("BRAND_NDC")
-                
-                logger.info(f"💊 RXNORM DATA EXTRACTED:")
-                logger.info(f"   - RxCUI: {rxcui}")
-                logger.info(f"   - NDC: {ndc or 'Not found'}")
-                logger.info(f"   - DEA Schedule: {drug_schedule or 'Not controlled'}")
-                logger.info(f"   - Brand Drug: {brand_drug or 'Generic only'}")
-                logger.info(f"   - Brand NDC: {brand_ndc or 'Not found'}")
-                
-                result_data = {
-                    "rxcui": rxcui,
-                    "ndc": ndc,
-                    "drug_schedule": drug_schedule,
-                    "brand_drug": brand_drug,
-                    "brand_ndc": brand_ndc
-                }
-                
-                logger.info(f"✅ RXNORM LOOKUP SUCCESS: {drug_name} mapped successfully")
-                return result_data
+                logger.info("📖 Fetching detailed drug information for concept %s", concept_id)
+                drug_details = await asyncio.wait_for(
+                    rxnorm_service.get_drug_details(concept_id),
+                    timeout=settings.rxnorm_lookup_timeout
+                )
             else:
-                logger.warning(f"⚠️ No concept ID found in search results for {drug_name}")
+                logger.warning("⚠️ No concept ID found in search results for %s", drug_name)
+                best_match = None
         else:
-            logger.warning(f"❌ RXNORM NO RESULTS: No matches found for '{drug_name}' in knowledge graph")
+            logger.warning("❌ RXNORM NO RESULTS: No matches found for '%s' in knowledge graph", drug_name)
+        
+        _rxnorm_breaker.record_success()
         
-        # Return empty structure with logging
-        logger.info(f"📝 Returning empty RxNorm data structure for {drug_name}")
-        return {
-            "rxcui": None,
-            "ndc": None,
-            "drug_schedule": None,
-            "brand_drug": None,
-            "brand_ndc": None
-        }
+        # Freeze the cached entry so callers cannot corrupt later cache hits
+        lookup = _freeze_lookup(best_match, drug_details)
+        _rxnorm_cache.set(cache_key, lookup)
+        await _shared_cache_set(cache_key, best_match, drug_details)
+        return lookup
+        
+    except asyncio.TimeoutError:
+        _rxnorm_breaker.record_failure()
+        logger.error("⏱️ RXNORM LOOKUP TIMEOUT for '%s' after %ss", drug_name, settings.rxnorm_lookup_timeout)
+        return None
         
     except Exception as e:
-        logger.error(f"💥 RXNORM LOOKUP ERROR for '{drug_name}': {str(e)}")
-        logger.error(f"🔧 Error type: {type(e).__name__}")
+        _rxnorm_breaker.record_failure()
+        logger.error("💥 RXNORM LOOKUP ERROR for '%s': %s", drug_name, e)
+        logger.error("🔧 Error type: %s", type(e).__name__)
+        return None
+
+
+@observe(name="rxnorm_drug_lookup_enhanced", as_type="generation", capture_input=True, capture_output=True)
+async def get_rxnorm_drug_info(drug_name: str, strength: str = None) -> Dict[str, Any]:
+    """
+    Get drug information from RxNorm Neo4j knowledge graph with comprehensive logging
+    
+    Args:
+        drug_name: Name of the drug
+        strength: Drug strength (optional)
         
-        # Return empty structure on error
-        return {
-            "rxcui": None,
-            "ndc": None,
-            "drug_schedule": None,
-            "brand_drug": None,
-            "brand_ndc": None
-        }
+    Returns:
+        Dictionary with RxNorm information
+    """
+    logger.info("🔍 RXNORM LOOKUP START: Drug='%s', Strength='%s'", drug_name, strength or 'N/A')
+    
+    lookup = await lookup_rxnorm_match(drug_name, strength)
+    if not lookup or not lookup["match"]:
+        # Return empty structure on not-found or error
+        logger.info("📝 Returning empty RxNorm data structure for %s", drug_name)
+        return {**_EMPTY_RXNORM_RESULT}
+    
+    best_match = lookup["match"]
+    drug_details = lookup["details"]
+    
+    # Normalize the RxCUI once; the raw value stays in the match for graph queries
+    rxcui = str(best_match["concept_id"])
+    logger.info("✅ RXNORM MATCH FOUND: Concept ID=%s, Name='%s'", rxcui, best_match.get("concept_name", drug_name))
+    
+    # Log detailed information found
+    ndc = drug_details.get("NDC")
+    drug_schedule = drug_details.get("DEA_SCHEDULE") 
+    brand_drug = drug_details.get("BRAND_NAME") or best_match.get("generic_name")
+    brand_ndc = drug_details.get("BRAND_NDC")
+    
+    logger.info("💊 RXNORM DATA EXTRACTED:")
+    logger.info("   - RxCUI: %s", rxcui)
+    logger.info("   - NDC: %s", ndc or 'Not found')
+    logger.info("   - DEA Schedule: %s", drug_schedule or 'Not controlled')
+    logger.info("   - Brand Drug: %s", brand_drug or 'Generic only')
+    logger.info("   - Brand NDC: %s", brand_ndc or 'Not found')
+    
+    result_data = {
+        "rxcui": rxcui,
+        "ndc": ndc,
+        "drug_schedule": drug_schedule,
+        "brand_drug": brand_drug,
+        "brand_ndc": brand_ndc
+    }
+    
+    logger.info("✅ RXNORM LOOKUP SUCCESS: %s mapped successfully", drug_name)
+    return result_data
+
+
+def _canonicalize_term(term: Optional[str]) -> str:
+    """Lowercase a search term and collapse its whitespace"""
+    return " ".join((term or "").lower().split())
+
+
+async def get_rxnorm_many(medications: List[Dict[str, Any]], concurrency: int = 8) -> List[Dict[str, Any]]:
+    """
+    Look up RxNorm information for several medications concurrently
+    
+    Medications that only differ by case or spacing of their name/strength
+    are looked up once. Lookups run under a semaphore so a long prescription
+    cannot exhaust the Neo4j connection pool.
+    
+    Args:
+        medications: Medication dictionaries with drug_name and optional strength
+        concurrency: Maximum number of lookups in flight at once
+        
+    Returns:
+        RxNorm information for each medication, in input order. Medications
+        with the same canonical key share one dictionary; treat it as read-only.
+    """
+    # Map each medication to a canonical lookup key, keeping the first occurrence per key
+    keys = []
+    unique_lookups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for medication in medications:
+        drug_name = medication.get("drug_name")
+        if not drug_name:
+            keys.append(None)
+            continue
+        key = (_canonicalize_term(drug_name), _canonicalize_term(medication.get("strength")))
+        keys.append(key)
+        unique_lookups.setdefault(key, medication)
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _lookup(medication: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await get_rxnorm_drug_info(medication["drug_name"], medication.get("strength"))
+    
+    results = await asyncio.gather(*(_lookup(medication) for medication in unique_lookups.values()))
+    results_by_key = dict(zip(unique_lookups, results))
+    
+    # Duplicate medications share one result; callers merge it into their own dict
+    return [
+        results_by_key[key] if key else {**_EMPTY_RXNORM_RESULT}
+        for key in keys
+    ]
 
 
 def calculate_quantity_from_sig(instructions: str, days_supply: int = 30) -> Tuple[str, bool]:
@@ -125,29 +495,23 @@ def calculate_quantity_from_sig(instructions: str, days_supply: int = 30) -> Tup
     frequency = 1   # Default
     
     # Extract frequency
-    if "twice" in instructions_lower or "bid" in instructions_lower or "b.i.d" in instructions_lower:
-        frequency = 2
-    elif "three times" in instructions_lower or "tid" in instructions_lower or "t.i.d" in instructions_lower:
-        frequency = 3
-    elif "four times" in instructions_lower or "qid" in instructions_lower or "q.i.d" in instructions_lower:
-        frequency = 4
-    elif "daily" in instructions_lower or "qd" in instructions_lower or "once" in instructions_lower:
-        frequency = 1
+    freq_match = _FREQ_RE.search(instructions_lower)
+    if freq_match:
+        frequency = _FREQ_MAP[freq_match.group(1)]
     
     # Extract dose amount (look for numbers)
-    import re
-    dose_match = re.search(r'(\d+)', instructions)
+    dose_match = _NUM_RE.search(instructions)
     if dose_match:
-        daily_dose = int(dose_match.group(1))
+        daily_dose = int(dose_match.group())
     
     # Calculate total quantity
     total_quantity = daily_dose * frequency * days_supply
     
     # Format based on medication type
-    if any(word in instructions_lower for word in ["drop", "gtt"]):
+    if _DROP_FORM_RE.search(instructions_lower):
         # For drops, return as bottle (ml)
         return f"{max(5, total_quantity // 20)} mL", True
-    elif any(word in instructions_lower for word in ["apply", "cream", "ointment", "gel"]):
+    elif _TOPICAL_FORM_RE.search(instructions_lower):
         # For topicals, return as tube/jar
         return f"{max(15, total_quantity)} g", True
     else:
@@ -171,27 +535,19 @@ def infer_days_from_quantity(quantity: str, instructions: str) -> Tuple[str, boo
     
     try:
         # Extract numeric quantity
-        import re
-        qty_match = re.search(r'(\d+)', quantity)
+        qty_match = _NUM_RE.search(quantity)
         if not qty_match:
             return "30", True
         
-        qty_num = int(qty_match.group(1))
-        
-        # Extract frequency from instructions
-        instructions_lower = instructions.lower()
-        frequency = 1  # Default once daily
+        qty_num = int(qty_match.group())
         
-        if "twice" in instructions_lower or "bid" in instructions_lower:
-            frequency = 2
-        elif "three times" in instructions_lower or "tid" in instructions_lower:
-            frequency = 3
-        elif "four times" in instructions_lower or "qid" in instructions_lower:
-            frequency = 4
+        # Extract frequency from instructions (default once daily)
+        freq_match = _FREQ_RE.search(instructions.lower())
+        frequency = _FREQ_MAP[freq_match.group(1)] if freq_match else 1
         
         # Extract dose per administration
-        dose_match = re.search(r'(\d+)', instructions)
-        dose_per_admin = int(dose_match.group(1)) if dose_match else 1
+        dose_match = _NUM_RE.search(instructions)
+        dose_per_admin = int(dose_match.group()) if dose_match else 1
         
         # Calculate days
         total_daily_dose = dose_per_admin * frequency
@@ -213,70 +569,77 @@ def validate_medication_data(medication: Dict[str, Any]) -> Tuple[bool, List[str
         medication: Medication dictionary to validate
         
     Returns:
-        Tuple of (is_valid, warnings, cleaned_medication)
+        Tuple of (is_valid, warnings, cleaned_medication). The input dict is
+        returned as-is when nothing needed correcting.
     """
     warnings = []
-    cleaned_med = medication.copy()
+    # Corrections are collected here and merged into a copy only if there are any
+    changes = {}
     
     # Check required fields
     required_fields = ["drug_name", "strength", "instructions_for_use"]
     for field in required_fields:
-        if not cleaned_med.get(field):
+        if not medication.get(field):
             warnings.append(f"Missing required field: {field}")
     
     # Validate drug name
-    drug_name = cleaned_med.get("drug_name", "")
+    drug_name = medication.get("drug_name", "")
     if drug_name and len(drug_name.strip()) < 2:
         warnings.append("Drug name appears too short or invalid")
     
     # Validate strength format
-    strength = cleaned_med.get("strength", "")
-    if strength and not any(char.isdigit() for char in strength):
+    strength = medication.get("strength", "")
+    if strength and not _HAS_DIGIT(strength):
         warnings.append("Strength appears to lack numeric value")
     
     # Validate quantity
-    quantity = cleaned_med.get("quantity")
-    if quantity and str(quantity).strip():
-        if not any(char.isdigit() for char in str(quantity)):
-            # Check if it's a valid quantity description
-            valid_units = ["tabs", "capsules", "ml", "bottles", "tubes", "g", "mg", "units"]
-            if not any(unit in str(quantity).lower() for unit in valid_units):
-                warnings.append("Quantity format appears invalid")
+    quantity = medication.get("quantity")
+    quantity_str = str(quantity) if quantity else ""
+    if quantity_str.strip() and not _HAS_DIGIT(quantity_str):
+        # Check if it's a valid quantity description
+        quantity_lower = quantity_str.lower()
+        if not any(unit in quantity_lower for unit in _VALID_QUANTITY_UNITS):
+            warnings.append("Quantity format appears invalid")
     
     # Validate refills
-    refills = cleaned_med.get("refills")
+    refills = medication.get("refills")
     if refills is not None:
         try:
             refill_num = int(str(refills).replace("refills", "").replace("refill", "").strip())
             if refill_num < 0 or refill_num > 12:  # Reasonable refill range
                 warnings.append("Refill count appears unusual")
-            cleaned_med["refills"] = str(refill_num)
+            if str(refill_num) != refills:
+                changes["refills"] = str(refill_num)
         except (ValueError, TypeError):
             warnings.append("Invalid refill format")
-            cleaned_med["refills"] = "0"
+            changes["refills"] = "0"
     
     # Validate certainty score
-    certainty = cleaned_med.get("certainty")
+    certainty = medication.get("certainty")
     if certainty is not None:
         try:
             cert_val = int(certainty)
             if cert_val < 0 or cert_val > 100:
                 warnings.append("Certainty should be between 0-100")
-                cleaned_med["certainty"] = 50
+                changes["certainty"] = 50
         except (ValueError, TypeError):
             warnings.append("Certainty should be numeric")
-            cleaned_med["certainty"] = 50
+            changes["certainty"] = 50
     
     # Set defaults for inference flags
-    if "infer_qty" not in cleaned_med:
-        cleaned_med["infer_qty"] = "No"
-    if "infer_days" not in cleaned_med:
-        cleaned_med["infer_days"] = "No"
+    if "infer_qty" not in medication:
+        changes["infer_qty"] = "No"
+    if "infer_days" not in medication:
+        changes["infer_days"] = "No"
+    
+    cleaned_med = {**medication, **changes} if changes else medication
     
     is_valid = len(warnings) == 0
     return is_valid, warnings, cleaned_med
 
 
+# Sigs repeat heavily across prescriptions ("1 tab po qd") and the expansion is pure
+@lru_cache(maxsize=4096)
 def generate_sig_english(instructions: str) -> str:
     """
     Generate clear English instructions from prescription sig
@@ -290,50 +653,24 @@ def generate_sig_english(instructions: str) -> str:
     if not instructions or not instructions.strip():
         return ""
     
-    # Common abbreviation mappings
-    sig_mappings = {
-        "po": "by mouth",
-        "bid": "twice daily",
-        "tid": "three times daily", 
-        "qid": "four times daily",
-        "qd": "once daily",
-        "daily": "daily",
-        "prn": "as needed",
-        "ac": "before meals",
-        "pc": "after meals",
-        "hs": "at bedtime",
-        "q4h": "every 4 hours",
-        "q6h": "every 6 hours",
-        "q8h": "every 8 hours",
-        "q12h": "every 12 hours",
-        "gtt": "drop",
-        "gtts": "drops",
-        "ou": "both eyes",
-        "od": "right eye",
-        "os": "left eye",
-        "au": "both ears",
-        "ad": "right ear",
-        "as": "left ear"
-    }
-    
     # Start with the original instructions
     result = instructions.lower()
     
-    # Replace common abbreviations
-    for abbrev, full_text in sig_mappings.items():
-        result = result.replace(abbrev, full_text)
+    # Replace common abbreviations in a single pass over whole words
+    result = _SIG_RE.sub(lambda match: _SIG_MAPPINGS[match.group(1)], result)
     
     # Add action verb if missing
-    if not any(verb in result for verb in ["take", "apply", "instill", "use", "insert"]):
-        if any(word in result for word in ["drop", "eye", "ear"]):
+    if not _SIG_ACTION_VERB_RE.search(result):
+        if _SIG_INSTILL_RE.search(result):
             result = "instill " + result
-        elif any(word in result for word in ["cream", "ointment", "gel", "apply"]):
+        elif _SIG_APPLY_RE.search(result):
             result = "apply " + result
         else:
             result = "take " + result
     
-    # Capitalize first letter and clean up
-    result = result.strip().capitalize()
+    # Capitalize first letter and clean up (the text is already lowercase)
+    result = result.strip()
+    result = result[:1].upper() + result[1:]
     
     return result
 
@@ -370,19 +707,14 @@ def repair_medications_json(json_text: str) -> Tuple[bool, Optional[List[Dict[st
         for med in medications:
             if isinstance(med, dict):
                 # Ensure all expected fields are present
-                expected_fields = [
-                    "drug_name", "strength", "instructions_for_use", "quantity", 
-                    "infer_qty", "days_of_use", "infer_days", "refills", "certainty"
-                ]
-                for field in expected_fields:
-                    if field not in med:
-                        med[field] = None
+                for field in _EXPECTED_MEDICATION_FIELDS:
+                    med.setdefault(field, None)
                 
                 cleaned_medications.append(med)
         
-        logger.info(f"Successfully repaired medications JSON with {len(cleaned_medications)} medications")
+        logger.info("Successfully repaired medications JSON with %d medications", len(cleaned_medications))
         return True, cleaned_medications, None
         
     except Exception as e:
-        logger.error(f"Medications JSON repair failed: {e}")
-        return False, None, str(e)
\ No newline at end of file
+        logger.error("Medications JSON repair failed: %s", e)
+        return False, None, str(e)
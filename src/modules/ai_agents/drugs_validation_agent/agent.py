@@ -4,10 +4,9 @@ Validates medication information using Gemini 2.5 Pro
 """
 
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 
 # Optional LangFuse import
 try:
@@ -27,11 +26,7 @@ class DrugsValidationAgent:
     
     def __init__(self):
         """Initialize the drugs validation agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
         logger.info("Drugs Validation Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="drugs_validation", as_type="generation", capture_input=True, capture_output=True)
@@ -78,12 +73,12 @@ class DrugsValidationAgent:
             
             logger.info(f"Drugs validation completed: {validation_results['validated_count']}/{validation_results['total_medications']} valid")
             
-            return {
-                **state,
+            state.setdefault("quality_warnings", []).extend(validation_results["warnings"])
+            state.update({
                 "processed_medications": validated_medications,
-                "drugs_validation_results": validation_results,
-                "quality_warnings": state.get("quality_warnings", []) + validation_results["warnings"]
-            }
+                "drugs_validation_results": validation_results
+            })
+            return state
             
         except Exception as e:
             logger.error(f"Drugs validation failed: {e}")
@@ -103,9 +98,5 @@ class DrugsValidationAgent:
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
         """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
\ No newline at end of file
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
\ No newline at end of file
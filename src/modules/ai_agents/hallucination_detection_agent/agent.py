@@ -3,11 +3,17 @@ Hallucination Detection Agent
 Detects potential hallucinations and inconsistencies in extracted prescription data using Gemini 2.5 Pro
 """
 
+import asyncio
+import hashlib
+import re
+from enum import Enum
 from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel, Field
 
 from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
+from src.modules.ai_agents.utils.ttl_cache import TTLCache
 
 # Optional LangFuse import
 try:
@@ -25,20 +31,60 @@ from .prompts import (
 from .tools import (
     detect_data_inconsistencies,
     validate_medical_plausibility,
-    check_prescription_completeness
+    check_prescription_completeness,
+    get_min_certainty
 )
 
 
+# Gemini check responses keyed by a hash of the prompt (temperature 0 makes them reusable)
+_check_response_cache = TTLCache(
+    maxsize=settings.hallucination_cache_size,
+    ttl=settings.hallucination_cache_ttl_seconds
+)
+# One lock per in-flight prompt so concurrent identical checks share a single Gemini call
+_check_inflight: Dict[str, asyncio.Lock] = {}
+_check_cache_stats = {"hits": 0, "misses": 0}
+
+# Trigger phrases looked for in the (lowercased) plausibility check response, one
+# compiled alternation per flag so each flag costs a single scan
+_PLAUSIBILITY_CONCERN_RE = re.compile("questionable|review needed")
+_UNUSUAL_RE = re.compile("unusual|rare")
+
+
+class HallucinationIssueType(str, Enum):
+    """Categories the advanced consistency check may report"""
+    INCONSISTENT = "inconsistent"
+    UNREALISTIC = "unrealistic"
+    MISSING_CRITICAL = "missing_critical"
+
+
+class HallucinationIssue(BaseModel):
+    """Single issue reported by the advanced consistency check"""
+    type: HallucinationIssueType
+    detail: str = Field(default="", description="Short explanation of the issue")
+
+
+class HallucinationCheckResult(BaseModel):
+    """Structured Gemini response for the advanced consistency check"""
+    hallucination_detected: bool = Field(description="True when the data shows likely extraction errors")
+    issues: List[HallucinationIssue] = Field(default_factory=list)
+
+
+# Flag reported for each issue category of the advanced consistency check
+_ISSUE_MESSAGES = {
+    HallucinationIssueType.INCONSISTENT: "Data consistency issues detected",
+    HallucinationIssueType.UNREALISTIC: "Unrealistic values detected",
+    HallucinationIssueType.MISSING_CRITICAL: "Critical information missing",
+}
+
+
 class HallucinationDetectionAgent:
     """Agent for detecting hallucinations and inconsistencies using Gemini 2.5 Pro"""
     
     def __init__(self):
         """Initialize the hallucination detection agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
+        self.structured_llm = self.llm.with_structured_output(HallucinationCheckResult)
         logger.info("Hallucination Detection Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="hallucination_detection", as_type="generation", capture_input=True, capture_output=True)
@@ -66,44 +112,67 @@ class HallucinationDetectionAgent:
             consistency_issues = detect_data_inconsistencies(prescription_data)
             if consistency_issues:
                 hallucination_flags.extend(consistency_issues)
-                logger.warning(f"Data consistency issues detected: {consistency_issues}")
+                logger.warning("Data consistency issues detected: %s", consistency_issues)
             
-            # Check medical plausibility
             medications = prescription_data.get("medications", [])
             patient_info = prescription_data.get("patient", {})
             
-            if medications:
-                plausibility_issues = await self._check_medical_plausibility(medications, patient_info)
-                if plausibility_issues:
-                    hallucination_flags.extend(plausibility_issues)
-                    logger.warning(f"Medical plausibility issues detected: {plausibility_issues}")
-            
             # Check prescription completeness
             completeness_issues = check_prescription_completeness(prescription_data)
             if completeness_issues:
                 safety_flags.extend(completeness_issues)
-                logger.info(f"Completeness issues detected: {completeness_issues}")
+                logger.info("Completeness issues detected: %s", completeness_issues)
+            
+            # Only route prescriptions with a local signal (rule-based issues or
+            # lower certainty) through Gemini; clean ones are settled by the rules
+            min_certainty = get_min_certainty(prescription_data)
+            locally_clean = (
+                medications
+                and not consistency_issues
+                and not completeness_issues
+                and not validate_medical_plausibility(medications, patient_info)
+                and min_certainty is not None
+                and min_certainty >= settings.hallucination_llm_min_certainty
+            )
+            
+            # Run the Gemini checks (medical plausibility and advanced hallucination
+            # detection) concurrently; each handles its own errors
+            if locally_clean:
+                logger.info("Skipping Gemini hallucination checks: no local issues and minimum certainty %s", min_certainty)
+                plausibility_issues = []
+                advanced_checks = {"hallucination_detected": False, "issues": []}
+            elif medications:
+                plausibility_issues, advanced_checks = await asyncio.gather(
+                    self._check_medical_plausibility(medications, patient_info),
+                    self._perform_advanced_hallucination_checks(prescription_data)
+                )
+            else:
+                plausibility_issues = []
+                advanced_checks = await self._perform_advanced_hallucination_checks(prescription_data)
+            
+            # Check medical plausibility
+            if plausibility_issues:
+                hallucination_flags.extend(plausibility_issues)
+                logger.warning("Medical plausibility issues detected: %s", plausibility_issues)
             
             # Use Gemini for advanced hallucination detection
-            advanced_checks = await self._perform_advanced_hallucination_checks(prescription_data)
             if advanced_checks.get("hallucination_detected"):
                 hallucination_flags.extend(advanced_checks.get("issues", []))
             
-            logger.info(f"Hallucination detection completed. Flags: {len(hallucination_flags)} hallucinations, {len(safety_flags)} safety issues")
+            logger.info("Hallucination detection completed. Flags: %d hallucinations, %d safety issues", len(hallucination_flags), len(safety_flags))
             
-            return {
-                **state,
-                "hallucination_flags": hallucination_flags,
-                "safety_flags": safety_flags,
-                "hallucination_detection_results": {
-                    "total_flags": len(hallucination_flags) + len(safety_flags),
-                    "hallucination_score": min(len(hallucination_flags) * 10, 100),
-                    "safety_score": min(len(safety_flags) * 5, 100)
-                }
+            # The orchestrator carries the returned dict forward, so update the state in place
+            state["hallucination_flags"] = hallucination_flags
+            state["safety_flags"] = safety_flags
+            state["hallucination_detection_results"] = {
+                "total_flags": len(hallucination_flags) + len(safety_flags),
+                "hallucination_score": min(len(hallucination_flags) * 10, 100),
+                "safety_score": min(len(safety_flags) * 5, 100)
             }
+            return state
             
         except Exception as e:
-            logger.error(f"Hallucination detection failed: {e}")
+            logger.error("Hallucination detection failed: %s", e)
             return self._add_warning(state, f"Hallucination detection failed: {str(e)}")
     
     async def _check_medical_plausibility(self, medications: List[Dict[str, Any]], patient_info: Dict[str, Any]) -> List[str]:
@@ -118,22 +187,36 @@ class HallucinationDetectionAgent:
             List of plausibility issues
         """
         try:
-            prompt = get_medical_plausibility_check_prompt(medications, patient_info)
-            response = await self.llm.ainvoke(prompt)
+            chunk_size = settings.hallucination_plausibility_chunk_size
             
-            response_text = response.content.lower()
+            if len(medications) <= chunk_size:
+                prompt = get_medical_plausibility_check_prompt(medications, patient_info)
+                response_texts = [(await self._invoke_cached(prompt)).lower()]
+            else:
+                # Very long lists are split into prompts checked concurrently; each one
+                # carries every medication name so combinations across chunks are still reviewed
+                all_names = [med.get("drug_name") for med in medications]
+                chunks = [medications[i:i + chunk_size] for i in range(0, len(medications), chunk_size)]
+                semaphore = asyncio.Semaphore(settings.medication_max_concurrency)
+                
+                async def _check_chunk(chunk: List[Dict[str, Any]]) -> str:
+                    async with semaphore:
+                        prompt = get_medical_plausibility_check_prompt(chunk, patient_info, all_names)
+                        return (await self._invoke_cached(prompt)).lower()
+                
+                response_texts = await asyncio.gather(*(_check_chunk(chunk) for chunk in chunks))
             issues = []
             
-            if "questionable" in response_text or "review needed" in response_text:
+            if any(_PLAUSIBILITY_CONCERN_RE.search(text) for text in response_texts):
                 issues.append("Medical plausibility concerns identified")
             
-            if "unusual" in response_text or "rare" in response_text:
+            if any(_UNUSUAL_RE.search(text) for text in response_texts):
                 issues.append("Unusual drug combinations or dosages detected")
             
             return issues
             
         except Exception as e:
-            logger.error(f"Medical plausibility check failed: {e}")
+            logger.error("Medical plausibility check failed: %s", e)
             return ["Medical plausibility check failed"]
     
     async def _perform_advanced_hallucination_checks(self, prescription_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -148,38 +231,63 @@ class HallucinationDetectionAgent:
         """
         try:
             prompt = get_consistency_check_prompt(prescription_data)
-            response = await self.llm.ainvoke(prompt)
-            
-            response_text = response.content.lower()
+            check = await self._invoke_cached(prompt, structured=True)
             
-            results = {
-                "hallucination_detected": False,
-                "issues": [],
+            # One flag per reported category, in the order Gemini reported them
+            issue_types = dict.fromkeys(issue["type"] for issue in check["issues"])
+            return {
+                "hallucination_detected": check["hallucination_detected"],
+                "issues": [_ISSUE_MESSAGES[HallucinationIssueType(issue_type)] for issue_type in issue_types],
                 "confidence": 0.8
             }
             
-            # Analyze response for hallucination indicators
-            if "inconsistent" in response_text or "contradictory" in response_text:
-                results["hallucination_detected"] = True
-                results["issues"].append("Data consistency issues detected")
-            
-            if "impossible" in response_text or "unrealistic" in response_text:
-                results["hallucination_detected"] = True
-                results["issues"].append("Unrealistic values detected")
-            
-            if "missing critical" in response_text:
-                results["issues"].append("Critical information missing")
-            
-            return results
-            
         except Exception as e:
-            logger.error(f"Advanced hallucination check failed: {e}")
+            logger.error("Advanced hallucination check failed: %s", e)
             return {
                 "hallucination_detected": True,
                 "issues": ["Hallucination detection system error"],
                 "confidence": 0.0
             }
     
+    async def _invoke_cached(self, prompt: str, structured: bool = False) -> Any:
+        """
+        Invoke Gemini for a check prompt, reusing recent responses for identical prompts
+        
+        Args:
+            prompt: Check prompt
+            structured: Request a HallucinationCheckResult instead of free text
+            
+        Returns:
+            Response text, or the structured result as a dict
+        """
+        key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+        if structured:
+            key = f"structured:{key}"
+        cached = _check_response_cache.get(key)
+        if cached is not None:
+            _check_cache_stats["hits"] += 1
+            logger.info("Hallucination check cache hit (%d hits, %d misses)", _check_cache_stats["hits"], _check_cache_stats["misses"])
+            return cached
+        
+        lock = _check_inflight.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                # A concurrent identical check may have filled the cache while we waited
+                cached = _check_response_cache.get(key)
+                if cached is not None:
+                    _check_cache_stats["hits"] += 1
+                    return cached
+                
+                _check_cache_stats["misses"] += 1
+                if structured:
+                    result = (await self.structured_llm.ainvoke(prompt)).model_dump(mode="json")
+                else:
+                    result = (await self.llm.ainvoke(prompt)).content
+                _check_response_cache.set(key, result)
+                return result
+        finally:
+            _check_inflight.pop(key, None)
+    
     async def process(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process method for compatibility with workflow
@@ -193,10 +301,6 @@ class HallucinationDetectionAgent:
         return await self.detect_hallucinations(state)
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
-        """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
\ No newline at end of file
+        """Add warning to state (in place)"""
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
\ No newline at end of file
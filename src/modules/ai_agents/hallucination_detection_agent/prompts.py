@@ -3,7 +3,13 @@ Hallucination Detection Agent Prompts
 Contains prompts for detecting inconsistencies and medical implausibilities
 """
 
-from typing import Dict, Any, List
+import orjson
+from typing import Dict, Any, List, Optional
+
+
+def _to_json(data: Any) -> str:
+    """Serialize prompt data as compact JSON with sorted keys (stable prompts hit the check cache)"""
+    return orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS).decode()
 
 
 def get_hallucination_check_prompt(prescription_data: Dict[str, Any]) -> str:
@@ -20,7 +26,7 @@ def get_hallucination_check_prompt(prescription_data: Dict[str, Any]) -> str:
 You are a pharmacy intern working under a supervising pharmacist. Review extracted prescription data for potential errors or inconsistencies for pharmacist evaluation.
 
 Prescription data to review:
-{prescription_data}
+{_to_json(prescription_data)}
 
 Check for the following potential issues:
 1. Inconsistent or contradictory information
@@ -55,7 +61,7 @@ def get_consistency_check_prompt(prescription_data: Dict[str, Any]) -> str:
 You are a data quality specialist reviewing prescription information for internal consistency.
 
 Data to review:
-{prescription_data}
+{_to_json(prescription_data)}
 
 Check for consistency issues:
 1. Age vs. date of birth alignment
@@ -66,30 +72,47 @@ Check for consistency issues:
 
 Identify any inconsistencies or red flags that suggest extraction errors.
 
-Return your findings in a clear assessment format.
+Report your findings as structured output:
+- hallucination_detected: true if the data shows likely extraction errors
+- issues: one entry per problem, with "type" set to "inconsistent" (contradictory data),
+  "unrealistic" (impossible or unrealistic values) or "missing_critical" (critical
+  information missing), and a short "detail"
 """
 
 
-def get_medical_plausibility_check_prompt(medications: List[Dict[str, Any]], patient_info: Dict[str, Any]) -> str:
+def get_medical_plausibility_check_prompt(
+    medications: List[Dict[str, Any]],
+    patient_info: Dict[str, Any],
+    all_medication_names: Optional[List[str]] = None
+) -> str:
     """
     Get prompt for medical plausibility checking
     
     Args:
         medications: List of medications to check
         patient_info: Patient information for context
+        all_medication_names: Names of every medication on the prescription, given when
+            medications is only part of the list so combinations are still checked against all of them
         
     Returns:
         Medical plausibility check prompt
     """
+    full_list = ""
+    if all_medication_names:
+        full_list = f"""
+All medications on this prescription (check combinations against every one of these):
+{_to_json(all_medication_names)}
+"""
+    
     return f"""
 You are a clinical pharmacist reviewing medication prescriptions for medical plausibility.
 
 Patient information:
-{patient_info}
+{_to_json(patient_info)}
 
 Medications prescribed:
-{medications}
-
+{_to_json(medications)}
+{full_list}
 Evaluate the medical plausibility:
 1. Are the medications appropriate for the patient age/condition?
 2. Are the dosages within normal ranges?
@@ -3,10 +3,42 @@ Hallucination Detection Agent Tools
 Contains tools for detecting inconsistencies and validating medical plausibility
 """
 
-from typing import Dict, Any, List, Optional
+import re
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
 from src.core.settings.logging import logger
 
 
+# Digit check used by the identifier format checks
+_HAS_DIGIT = re.compile(r"\d").search
+_INT_RE = re.compile(r"\d+")
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+# Separators dropped from an NPI before its length check
+_NPI_STRIP = str.maketrans("", "", "- ")
+
+# Drug class name fragments, each compiled into one alternation searched per name
+_ANTIBIOTIC_RE = re.compile("cillin|mycin|floxacin|cef")
+_OPIOID_RE = re.compile("codeine|morphine|oxycodone|hydrocodone")
+_CONTROLLED_SUBSTANCE_RE = re.compile("codeine|morphine|oxycodone|hydrocodone|adderall|xanax|ativan")
+
+# Placeholder drug names and non-dosage strength units flagged by the plausibility check
+_PLACEHOLDER_NAME_RE = re.compile("test|example|sample|placeholder")
+_INVALID_STRENGTH_UNIT_RE = re.compile("kg|pounds|miles|hours")
+
+
+def _count_section_fields(section: Dict[str, Any]) -> Tuple[int, int]:
+    """Count the (total, empty) data fields of a prescription section, ignoring certainty"""
+    total_fields = 0
+    empty_fields = 0
+    for field_name, field_value in section.items():
+        if field_name != "certainty":
+            total_fields += 1
+            if not field_value:
+                empty_fields += 1
+    return total_fields, empty_fields
+
+
 def detect_data_inconsistencies(prescription_data: Dict[str, Any]) -> List[str]:
     """
     Detect basic data inconsistencies in prescription data
@@ -20,21 +52,44 @@ def detect_data_inconsistencies(prescription_data: Dict[str, Any]) -> List[str]:
     issues = []
     
     try:
+        # Certainty vs completeness totals, accumulated while each section is checked
+        total_certainty = 0
+        certainty_count = 0
+        empty_fields = 0
+        total_fields = 0
+        
         # Check prescriber data consistency
         prescriber = prescription_data.get("prescriber", {})
+        if isinstance(prescriber, dict):
+            prescriber_certainty = prescriber.get("certainty")
+            if prescriber_certainty:
+                total_certainty += prescriber_certainty
+                certainty_count += 1
+            section_total, section_empty = _count_section_fields(prescriber)
+            total_fields += section_total
+            empty_fields += section_empty
         if prescriber:
             # Check for empty prescriber with high certainty
-            if prescriber.get("certainty", 0) > 70 and not prescriber.get("full_name"):
+            if (prescriber_certainty or 0) > 70 and not prescriber.get("full_name"):
                 issues.append("High certainty claimed for missing prescriber data")
             
             # Check NPI format if present
             npi = prescriber.get("npi_number")
-            if npi and len(str(npi).replace("-", "").replace(" ", "")) != 10:
-                if not any(char.isdigit() for char in str(npi)):
+            if npi:
+                npi = str(npi)
+                if len(npi.translate(_NPI_STRIP)) != 10 and not _HAS_DIGIT(npi):
                     issues.append("Invalid NPI format detected")
         
         # Check patient data consistency
         patient = prescription_data.get("patient", {})
+        if isinstance(patient, dict):
+            patient_certainty = patient.get("certainty")
+            if patient_certainty:
+                total_certainty += patient_certainty
+                certainty_count += 1
+            section_total, section_empty = _count_section_fields(patient)
+            total_fields += section_total
+            empty_fields += section_empty
         if patient:
             # Check age and DOB consistency
             age = patient.get("age")
@@ -42,19 +97,26 @@ def detect_data_inconsistencies(prescription_data: Dict[str, Any]) -> List[str]:
             
             if age and dob:
                 try:
-                    from datetime import datetime
-                    if "/" in str(dob):
+                    dob_str = str(dob)
+                    if "/" in dob_str:
                         # Try MM/DD/YYYY format
-                        dob_date = datetime.strptime(str(dob), "%m/%d/%Y")
+                        dob_year = datetime.strptime(dob_str, "%m/%d/%Y").year
                     else:
-                        # Try YYYY-MM-DD format
-                        dob_date = datetime.strptime(str(dob), "%Y-%m-%d")
+                        # Try YYYY-MM-DD format (C-level ISO parser); strptime still
+                        # accepts non-padded dates such as 1980-1-5
+                        try:
+                            dob_year = date.fromisoformat(dob_str).year
+                        except ValueError:
+                            dob_year = datetime.strptime(dob_str, "%Y-%m-%d").year
                     
-                    calculated_age = datetime.now().year - dob_date.year
-                    provided_age = int(str(age).split()[0])  # Handle "25 years" format
-                    
-                    if abs(calculated_age - provided_age) > 2:  # Allow 2 year tolerance
-                        issues.append("Age significantly inconsistent with date of birth")
+                    # Handle "25 years" format
+                    age_match = _INT_RE.search(str(age))
+                    if age_match:
+                        calculated_age = date.today().year - dob_year
+                        provided_age = int(age_match.group())
+                        
+                        if abs(calculated_age - provided_age) > 2:  # Allow 2 year tolerance
+                            issues.append("Age significantly inconsistent with date of birth")
                         
                 except (ValueError, TypeError):
                     pass
@@ -68,15 +130,18 @@ def detect_data_inconsistencies(prescription_data: Dict[str, Any]) -> List[str]:
             quantity = med.get("quantity")
             if quantity:
                 try:
-                    qty_num = int(''.join(filter(str.isdigit, str(quantity))))
+                    qty_num = int(_NON_DIGIT_RE.sub("", str(quantity)))
                     if qty_num > 10000:  # Unreasonably large quantity
                         issues.append(f"Unreasonably large quantity for {med_name}: {quantity}")
                 except (ValueError, TypeError):
                     pass
             
             # Check for missing critical fields with high certainty
-            certainty = med.get("certainty", 0)
-            if certainty > 80:
+            certainty = med.get("certainty")
+            if certainty:
+                total_certainty += certainty
+                certainty_count += 1
+            if (certainty or 0) > 80:
                 if not med.get("drug_name"):
                     issues.append(f"High certainty claimed for medication with missing drug name")
                 if not med.get("instructions_for_use"):
@@ -85,38 +150,9 @@ def detect_data_inconsistencies(prescription_data: Dict[str, Any]) -> List[str]:
             # Check refills consistency
             refills = med.get("refills")
             if refills:
-                try:
-                    refill_num = int(str(refills).replace("refills", "").strip())
-                    if refill_num > 12:  # Unreasonably high refills
-                        issues.append(f"Unreasonably high refill count for {med_name}: {refills}")
-                except (ValueError, TypeError):
-                    pass
-        
-        # Check overall data completeness vs certainty claims
-        total_certainty = 0
-        certainty_count = 0
-        empty_fields = 0
-        total_fields = 0
-        
-        for section_name, section_data in prescription_data.items():
-            if isinstance(section_data, dict) and section_name in ["prescriber", "patient"]:
-                section_certainty = section_data.get("certainty")
-                if section_certainty:
-                    total_certainty += section_certainty
-                    certainty_count += 1
-                
-                for field_name, field_value in section_data.items():
-                    if field_name != "certainty":
-                        total_fields += 1
-                        if not field_value:
-                            empty_fields += 1
-            elif isinstance(section_data, list) and section_name == "medications":
-                for med in section_data:
-                    if isinstance(med, dict):
-                        med_certainty = med.get("certainty")
-                        if med_certainty:
-                            total_certainty += med_certainty
-                            certainty_count += 1
+                refill_match = _INT_RE.search(str(refills))
+                if refill_match and int(refill_match.group()) > 12:  # Unreasonably high refills
+                    issues.append(f"Unreasonably high refill count for {med_name}: {refills}")
         
         # Check if high average certainty but many empty fields
         if certainty_count > 0 and total_fields > 0:
@@ -126,11 +162,11 @@ def detect_data_inconsistencies(prescription_data: Dict[str, Any]) -> List[str]:
             if avg_certainty > 75 and empty_ratio > 0.5:
                 issues.append("High certainty claimed despite significant missing data")
         
-        logger.info(f"Data consistency check completed. Found {len(issues)} issues")
+        logger.info("Data consistency check completed. Found %d issues", len(issues))
         return issues
         
     except Exception as e:
-        logger.error(f"Data consistency check failed: {e}")
+        logger.error("Data consistency check failed: %s", e)
         return ["Data consistency check failed due to system error"]
 
 
@@ -146,23 +182,27 @@ def validate_medical_plausibility(medications: List[Dict[str, Any]], patient_inf
         List of plausibility issues
     """
     issues = []
+    drug_names = []
     
     try:
         for med in medications:
             drug_name = med.get("drug_name", "").lower()
-            strength = med.get("strength", "").lower()
             quantity = med.get("quantity", "")
             
             # Check for common medication name patterns
             if drug_name:
+                drug_names.append(drug_name)
+                
                 # Flag obviously non-medical names
-                if any(word in drug_name for word in ["test", "example", "sample", "placeholder"]):
+                if _PLACEHOLDER_NAME_RE.search(drug_name):
                     issues.append(f"Non-medical drug name detected: {drug_name}")
                 
                 # Check for impossible strength combinations
+                strength = med.get("strength", "")
                 if strength:
                     # Flag if strength contains obviously wrong units
-                    if any(unit in strength for unit in ["kg", "pounds", "miles", "hours"]):
+                    strength = strength.lower()
+                    if _INVALID_STRENGTH_UNIT_RE.search(strength):
                         issues.append(f"Invalid strength units for {drug_name}: {strength}")
             
             # Check quantity plausibility
@@ -170,7 +210,7 @@ def validate_medical_plausibility(medications: List[Dict[str, Any]], patient_inf
                 try:
                     qty_str = str(quantity).lower()
                     # Extract numeric part
-                    qty_numbers = ''.join(filter(str.isdigit, qty_str))
+                    qty_numbers = _NON_DIGIT_RE.sub("", qty_str)
                     if qty_numbers:
                         qty_num = int(qty_numbers)
                         
@@ -189,22 +229,26 @@ def validate_medical_plausibility(medications: List[Dict[str, Any]], patient_inf
                     pass
         
         # Check for drug interaction patterns (basic)
-        drug_names = [med.get("drug_name", "").lower() for med in medications if med.get("drug_name")]
+        # Flag if multiple similar medications (both classes tallied in one pass)
+        antibiotic_count = 0
+        pain_med_count = 0
+        for name in drug_names:
+            if _ANTIBIOTIC_RE.search(name):
+                antibiotic_count += 1
+            if _OPIOID_RE.search(name):
+                pain_med_count += 1
         
-        # Flag if multiple similar medications
-        antibiotic_count = sum(1 for name in drug_names if any(ab in name for ab in ["cillin", "mycin", "floxacin", "cef"]))
         if antibiotic_count > 2:
             issues.append("Multiple antibiotics prescribed simultaneously")
         
-        pain_med_count = sum(1 for name in drug_names if any(pm in name for pm in ["codeine", "morphine", "oxycodone", "hydrocodone"]))
         if pain_med_count > 1:
             issues.append("Multiple opioid pain medications prescribed")
         
-        logger.info(f"Medical plausibility check completed. Found {len(issues)} issues")
+        logger.info("Medical plausibility check completed. Found %d issues", len(issues))
         return issues
         
     except Exception as e:
-        logger.error(f"Medical plausibility check failed: {e}")
+        logger.error("Medical plausibility check failed: %s", e)
         return ["Medical plausibility check failed"]
 
 
@@ -226,7 +270,8 @@ def check_prescription_completeness(prescription_data: Dict[str, Any]) -> List[s
         if not prescriber.get("full_name"):
             issues.append("Missing prescriber name")
         
-        if not prescriber.get("dea_number") and not prescriber.get("npi_number"):
+        dea_number = prescriber.get("dea_number")
+        if not dea_number and not prescriber.get("npi_number"):
             issues.append("Missing prescriber identification (DEA or NPI)")
         
         # Check patient information completeness
@@ -259,23 +304,48 @@ def check_prescription_completeness(prescription_data: Dict[str, Any]) -> List[s
             
             # Check for controlled substances without DEA
             drug_name = med.get("drug_name", "").lower()
-            controlled_indicators = ["codeine", "morphine", "oxycodone", "hydrocodone", "adderall", "xanax", "ativan"]
-            if any(indicator in drug_name for indicator in controlled_indicators):
-                if not prescriber.get("dea_number"):
+            if _CONTROLLED_SUBSTANCE_RE.search(drug_name):
+                if not dea_number:
                     issues.append(f"Controlled substance {med_id} prescribed without DEA number")
         
         # Check prescription date
         if not prescription_data.get("date_prescription_written"):
             issues.append("Missing prescription date")
         
-        logger.info(f"Prescription completeness check completed. Found {len(issues)} issues")
+        logger.info("Prescription completeness check completed. Found %d issues", len(issues))
         return issues
         
     except Exception as e:
-        logger.error(f"Prescription completeness check failed: {e}")
+        logger.error("Prescription completeness check failed: %s", e)
         return ["Prescription completeness check failed"]
 
 
+def get_min_certainty(prescription_data: Dict[str, Any]) -> Optional[float]:
+    """
+    Get the lowest certainty reported by the prescriber, patient and medication sections
+    
+    Args:
+        prescription_data: Complete prescription data
+        
+    Returns:
+        Lowest certainty score, or None when any section lacks a numeric one (such
+        prescriptions must not be treated as confidently extracted)
+    """
+    sections = [prescription_data.get("prescriber"), prescription_data.get("patient")]
+    sections.extend(prescription_data.get("medications") or [])
+    
+    scores = []
+    for section in sections:
+        if not isinstance(section, dict) or section.get("certainty") is None:
+            return None
+        # The model may report certainty as a string such as "95" or "95%"
+        try:
+            scores.append(float(str(section["certainty"]).strip().rstrip("%")))
+        except ValueError:
+            return None
+    return min(scores)
+
+
 def analyze_certainty_patterns(prescription_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze certainty score patterns to detect potential hallucination indicators
@@ -331,5 +401,5 @@ def analyze_certainty_patterns(prescription_data: Dict[str, Any]) -> Dict[str, A
         }
         
     except Exception as e:
-        logger.error(f"Certainty pattern analysis failed: {e}")
+        logger.error("Certainty pattern analysis failed: %s", e)
         return {"analysis": "Analysis failed", "suspicious": True, "indicators": ["Analysis error"]}
@@ -3,12 +3,16 @@ Image Extractor Agent
 Primary agent for extracting prescription data from images using Gemini 2.5 Pro
 """
 
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from typing import Dict, Any, List, Optional
+from google.api_core import exceptions as google_exceptions
 from langchain_core.messages import HumanMessage
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 
 from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import GEMINI_BATCH_TERMINAL_STATES, get_gemini_llm, get_genai_client
+from src.modules.ai_agents.utils.ttl_cache import TTLCache
 
 # Optional LangFuse import
 try:
@@ -18,8 +22,44 @@ except ImportError:
         def decorator(func):
             return func
         return decorator
-from .prompts import USER_PROMPT
-from .tools import validate_extraction_json
+from .prompts import USER_PROMPT, RETRY_FEEDBACK_TEMPLATE
+from src.modules.ai_agents.utils.image_data import get_image_bytes, get_image_data_url, get_image_hash
+from .tools import validate_extraction_json, build_batch_request
+
+
+# Text part shared by every first-attempt extraction message (never mutated)
+_USER_PROMPT_PART = {"type": "text", "text": USER_PROMPT}
+
+# First-attempt Gemini responses keyed by a BLAKE2b hash of the image, so re-submitted
+# images skip the vision call (retries carry feedback and are never cached)
+_extraction_cache = TTLCache(
+    maxsize=settings.image_extraction_cache_size,
+    ttl=settings.image_extraction_cache_ttl_seconds
+)
+
+# Transient Gemini failures retried in place, without a full workflow round-trip
+# (validation failures still go back through the workflow with feedback)
+_TRANSIENT_ERRORS = (
+    TimeoutError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+)
+
+
+def _extraction_prompt(state: Dict[str, Any]) -> str:
+    """Get the extraction prompt for a state, adding retry feedback if available"""
+    if state.get("retry_count", 0) > 0:
+        return USER_PROMPT + RETRY_FEEDBACK_TEMPLATE.format(feedback=state.get("feedback", ""))
+    return USER_PROMPT
+
+
+def _extraction_cache_key(state: Dict[str, Any]) -> Optional[str]:
+    """Get the response cache key for a first-attempt state (retries are never cached)"""
+    if state.get("retry_count", 0) > 0:
+        return None
+    return get_image_hash(state)
 
 
 class ImageExtractorAgent:
@@ -27,11 +67,10 @@ class ImageExtractorAgent:
     
     def __init__(self):
         """Initialize the image extractor agent with Gemini 2.5 Pro"""
-        self.llm_vision = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        # Transient errors are retried by _stream_extraction, so the client makes a single attempt
+        self.llm_vision = get_gemini_llm("gemini-2.5-pro", max_retries=1)
+        # Bounds concurrent Gemini calls when extracting a batch of prescriptions
+        self._semaphore = asyncio.Semaphore(settings.gemini_concurrency)
         logger.info("Image Extractor Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="image_extraction_agent", as_type="generation", capture_input=True, capture_output=True)
@@ -47,77 +86,268 @@ class ImageExtractorAgent:
         """
         logger.info("--- AGENT: Image Extractor ---")
         
-        image_base64 = state.get("image_base64")
-        if not image_base64:
+        if not state.get("image_bytes") and not state.get("image_base64"):
             logger.error("No image provided for extraction")
-            return {
-                **state,
-                "raw_extraction_text": None,
-                "quality_warnings": state.get("quality_warnings", []) + ["No image provided for extraction"]
-            }
+            state["raw_extraction_text"] = None
+            state.setdefault("quality_warnings", []).append("No image provided for extraction")
+            return state
+        
+        try:
+            # Use the exact user prompt, adding retry feedback if available
+            cache_key = _extraction_cache_key(state)
+            if cache_key:
+                text_part = _USER_PROMPT_PART
+            else:
+                text_part = {"type": "text", "text": _extraction_prompt(state)}
+            
+            response_text = _extraction_cache.get(cache_key) if cache_key else None
+            
+            if response_text is not None:
+                logger.info("Reusing cached Gemini extraction for identical image")
+            else:
+                # Downscale/re-encode the image off the event loop; the data URL is kept
+                # in the state for the other vision agents
+                image_url = await asyncio.to_thread(get_image_data_url, state)
+                
+                # Create LangChain message with image
+                message = HumanMessage(content=[
+                    text_part, 
+                    {"type": "image_url", "image_url": {"url": image_url}}
+                ])
+                
+                logger.info("Invoking Gemini 2.5 Pro for prescription extraction with exact user prompt...")
+                response_text = await self._stream_extraction(message)
+                logger.info("Gemini 2.5 Pro extraction complete")
+            
+            return self._apply_extraction_response(state, response_text, cache_key)
+            
+        except Exception as e:
+            return self._extraction_failed(state, e)
+    
+    def _apply_extraction_response(self, state: Dict[str, Any], response_text: Optional[str], cache_key: Optional[str]) -> Dict[str, Any]:
+        """
+        Validate a Gemini extraction response and update the state with its data
         
-        # Use the exact user prompt
-        prompt = USER_PROMPT
+        Args:
+            state: Workflow state the response belongs to
+            response_text: Raw Gemini response
+            cache_key: Response cache key, or None when the response must not be cached
+            
+        Returns:
+            Updated state with extracted data or validation feedback
+        """
+        logger.info(f"Extracted text length: {len(response_text) if response_text else 0} characters")
         
-        # Add retry feedback if available
-        retry_count = state.get("retry_count", 0)
-        if retry_count > 0:
-            feedback = state.get("feedback", "")
-            prompt += f"\n\nIMPORTANT FEEDBACK FROM PREVIOUS ATTEMPT:\n{feedback}\n\nPlease address the feedback and provide accurate extraction."
+        # Validate the extracted JSON
+        is_valid, parsed_data, error_msg = validate_extraction_json(response_text)
         
-        try:
-            # Create LangChain message with image
-            message = HumanMessage(content=[
-                {"type": "text", "text": prompt}, 
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-            ])
+        if is_valid and parsed_data:
+            logger.info("Successfully extracted and validated prescription data")
+            
+            # Only first-attempt responses that validated are worth reusing
+            if cache_key:
+                _extraction_cache.set(cache_key, response_text)
+            
+            # Prepare data for specialized agents (the orchestrator carries the
+            # returned dict forward, so the state is updated in place)
+            state.update({
+                "raw_extraction_text": response_text,
+                "prescription_data": parsed_data,
+                "medications_to_process": parsed_data.get("medications", []),
+                "patient_data": parsed_data.get("patient", {}),
+                "prescriber_data": parsed_data.get("prescriber", {}),
+                "is_valid": True,
+                "extraction_completed": True
+            })
+            return state
+        else:
+            logger.warning(f"Extraction validation failed: {error_msg}")
+            state.update({
+                "raw_extraction_text": response_text,
+                "is_valid": False,
+                "feedback": error_msg
+            })
+            state.setdefault("quality_warnings", []).append(f"Extraction validation failed: {error_msg}")
+            return state
+    
+    def _extraction_failed(self, state: Dict[str, Any], error: Any) -> Dict[str, Any]:
+        """Mark a state as failed extraction (in place)"""
+        logger.error(f"Image extraction failed: {error}")
+        state["raw_extraction_text"] = None
+        state["is_valid"] = False
+        state.setdefault("quality_warnings", []).append(f"Image extraction failed: {str(error)}")
+        return state
+    
+    @retry(
+        stop=stop_after_attempt(settings.gemini_retry_attempts),
+        wait=wait_exponential_jitter(initial=0.5, max=8),
+        retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+        reraise=True
+    )
+    async def _stream_extraction(self, message: HumanMessage) -> str:
+        """
+        Stream the Gemini response, stopping as soon as the outer JSON object is closed
+        
+        Transient errors (timeouts, 429, 5xx) are retried with exponential backoff.
+        
+        Args:
+            message: Extraction message with prompt and image
             
-            logger.info("Invoking Gemini 2.5 Pro for prescription extraction with exact user prompt...")
-            response = await self.llm_vision.ainvoke([message])
-            logger.info("Gemini 2.5 Pro extraction complete")
+        Returns:
+            Response text received so far (any trailing text after the JSON is not awaited)
+        """
+        parts = []
+        depth = 0
+        started = False
+        in_string = False
+        escaped = False
+        
+        async for chunk in self.llm_vision.astream([message]):
+            text = chunk.content if isinstance(chunk.content, str) else "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+            )
+            parts.append(text)
             
-            response_text = response.content
-            logger.info(f"Extracted text length: {len(response_text) if response_text else 0} characters")
+            # Track object depth outside JSON strings; depth back at 0 ends the object
+            for char in text:
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = started
+                elif char == "{":
+                    depth += 1
+                    started = True
+                elif char == "}" and started:
+                    depth -= 1
+                    if depth == 0:
+                        return "".join(parts)
+        
+        return "".join(parts)
+    
+    async def extract_batch(self, states: List[Dict[str, Any]], mode: str = "realtime") -> List[Dict[str, Any]]:
+        """
+        Extract prescription data from several images
+        
+        Args:
+            states: Workflow states, each containing image data
+            mode: "realtime" runs concurrent Gemini calls; "batch" submits the
+                uncached images as one Gemini Batch API job (cheaper, but it can
+                take minutes to hours) for non-interactive workloads
             
-            # Validate the extracted JSON
-            is_valid, parsed_data, error_msg = validate_extraction_json(response_text)
+        Returns:
+            The given states, updated in place, in the same order; failures are
+            reported per state through quality_warnings, as in extract_prescription_data
+        """
+        async def _extract_one(state: Dict[str, Any]) -> Dict[str, Any]:
+            async with self._semaphore:
+                return await self.extract_prescription_data(state)
+        
+        if mode != "batch":
+            return await asyncio.gather(*(_extract_one(state) for state in states))
+        
+        # Images without data or with a cached response need no Gemini call
+        job_indexes = []
+        local_indexes = []
+        for i, state in enumerate(states):
+            if not state.get("image_bytes") and not state.get("image_base64"):
+                local_indexes.append(i)
+                continue
+            try:
+                # Decode up front (retries too, which have no cache key)
+                get_image_bytes(state)
+                cache_key = _extraction_cache_key(state)
+            except Exception:
+                # Undecodable images are reported through the realtime path
+                local_indexes.append(i)
+                continue
+            if cache_key and _extraction_cache.get(cache_key) is not None:
+                local_indexes.append(i)
+            else:
+                job_indexes.append(i)
+        
+        results = list(states)
+        
+        local_results, job_results = await asyncio.gather(
+            asyncio.gather(*(_extract_one(states[i]) for i in local_indexes)),
+            self._extract_with_batch_job([states[i] for i in job_indexes])
+        )
+        for i, result in zip(local_indexes, local_results):
+            results[i] = result
+        for i, result in zip(job_indexes, job_results):
+            results[i] = result
+        return results
+    
+    async def _extract_with_batch_job(self, states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract prescription data through one Gemini Batch API job and wait for it
+        
+        Args:
+            states: Workflow states with image data
             
-            if is_valid and parsed_data:
-                logger.info("Successfully extracted and validated prescription data")
-                
-                # Prepare data for specialized agents
-                medications_to_process = parsed_data.get("medications", [])
-                patient_data = parsed_data.get("patient", {})
-                prescriber_data = parsed_data.get("prescriber", {})
-                
-                return {
-                    **state,
-                    "raw_extraction_text": response_text,
-                    "prescription_data": parsed_data,
-                    "medications_to_process": medications_to_process,
-                    "patient_data": patient_data,
-                    "prescriber_data": prescriber_data,
-                    "is_valid": True,
-                    "extraction_completed": True
-                }
+        Returns:
+            Updated states in the same order; every state that gets no valid
+            response is marked as failed
+        """
+        if not states:
+            return []
+        
+        async def _build_request(state: Dict[str, Any]) -> Dict[str, Any]:
+            return await asyncio.to_thread(build_batch_request, get_image_bytes(state), _extraction_prompt(state))
+        
+        # A state whose image cannot be decoded fails on its own, not the whole job
+        built = await asyncio.gather(*(_build_request(state) for state in states), return_exceptions=True)
+        job_states = []
+        requests = []
+        for state, request in zip(states, built):
+            if isinstance(request, Exception):
+                self._extraction_failed(state, request)
             else:
-                logger.warning(f"Extraction validation failed: {error_msg}")
-                return {
-                    **state,
-                    "raw_extraction_text": response_text,
-                    "is_valid": False,
-                    "feedback": error_msg,
-                    "quality_warnings": state.get("quality_warnings", []) + [f"Extraction validation failed: {error_msg}"]
-                }
+                job_states.append(state)
+                requests.append(request)
+        
+        if not job_states:
+            return list(states)
+        
+        try:
+            client = get_genai_client()
+            job = await client.aio.batches.create(
+                model="gemini-2.5-pro",
+                src=requests,
+                config={"display_name": "prescription-extraction"}
+            )
+            logger.info("Submitted Gemini batch job %s with %d prescriptions", job.name, len(job_states))
+            
+            while job.state.name not in GEMINI_BATCH_TERMINAL_STATES:
+                await asyncio.sleep(settings.gemini_batch_poll_seconds)
+                job = await client.aio.batches.get(name=job.name)
+            
+            if job.state.name != "JOB_STATE_SUCCEEDED":
+                raise RuntimeError(f"Gemini batch job {job.name} ended in state {job.state.name}")
+            
+            responses = list((job.dest.inlined_responses if job.dest else None) or [])
             
         except Exception as e:
-            logger.error(f"Image extraction failed: {e}")
-            return {
-                **state,
-                "raw_extraction_text": None,
-                "is_valid": False,
-                "quality_warnings": state.get("quality_warnings", []) + [f"Image extraction failed: {str(e)}"]
-            }
+            for state in job_states:
+                self._extraction_failed(state, e)
+            return list(states)
+        
+        if len(responses) != len(job_states):
+            logger.warning("Gemini batch job %s returned %d responses for %d prescriptions", job.name, len(responses), len(job_states))
+        
+        for i, state in enumerate(job_states):
+            inlined = responses[i] if i < len(responses) else None
+            if inlined is None:
+                self._extraction_failed(state, "missing batch response")
+            elif inlined.error or not inlined.response:
+                self._extraction_failed(state, inlined.error or "empty batch response")
+            else:
+                self._apply_extraction_response(state, inlined.response.text, _extraction_cache_key(state))
+        return list(states)
     
     async def process(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
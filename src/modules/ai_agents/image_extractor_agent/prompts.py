@@ -16,7 +16,7 @@ Follow these rules:
 4. For numeric values, use integers or decimals exactly as written.
 5. For units (mg, ml, tablets, etc.), include them exactly as shown.
 6. You may use RxNorm to add additional elements not present in the prescription regarding the medications.   You will add the RxCUI (rxcui in json), DEA Controlled Drug Schedule (drug_schedule) and the original Brand Reference Drug (Brand_Drug in json).  If you can find the information, add an active NDC Number for both the medication prescribed (ndc in json) and the NDC for the original Brand reference product (brand_ndc).
-7. You will also write a clear instruction for the patient on how to take the following medication based on the doctor's abbreviated instructions for use. Your instructions should include a verb, quantity, route and frequency. Use "Administer" for inhalation medications (not "Inhale"). Please output this instruction in the json in both english (sig_english) and spanish (sig_spanish). For the Spanish SIG do not use accents on any letters.
+7. You will also write a clear instruction for the patient on how to take the following medication based on the doctor's abbreviated instructions for use. Your instructions should include a verb, quantity, route and frequency. Use "Administer" for inhalation medications (not "Inhale"). Please output this instruction in the json in english (sig_english).
 8. If no quantity is written for a drug, then you may calculate or infer the quantity prescribed from the instructions assuming you will dispense a 30 days supply.  If you infer the quantity, then set the json value for infer_qty to Yes, otherwise set to No.
 9. If a quantity is written but no days of use is clearly expressed, infer the days of use by utilizing the prescriber's instructions.  If you infered the days of use, then set the infer_days value of the json to Yes; otherwise set to No.
 10. Look for the number of Refills written.  This may be by medication or written once for all medications.  Return this value as part of the json (refills).
@@ -58,7 +58,6 @@ Return your answer **only** as valid JSON with the following structure:
  "brand_drug": "string or null",
  "brand_ndc": "string or null",
  "sig_english": "string or null",
- "sig_spanish": "string or null",
  "refills": "string or null",
  "certainty": "numeric or null"
     }
@@ -66,6 +65,12 @@ Return your answer **only** as valid JSON with the following structure:
 }
 """
 
+# Suffix appended to USER_PROMPT when the agent retries with validation feedback
+RETRY_FEEDBACK_TEMPLATE = "\n\nIMPORTANT FEEDBACK FROM PREVIOUS ATTEMPT:\n{feedback}\n\nPlease address the feedback and provide accurate extraction."
+
+# Suffix appended by get_extraction_prompt for a failed validation
+_CORRECTION_TEMPLATE = "\n\n**CRITICAL CORRECTION REQUIRED:** Your previous attempt failed validation with the following error: '{feedback}'. You MUST fix this specific error in your response."
+
 
 def get_extraction_prompt(retry_feedback: str = None) -> str:
     """
@@ -77,9 +82,7 @@ def get_extraction_prompt(retry_feedback: str = None) -> str:
     Returns:
         Complete extraction prompt
     """
-    prompt = USER_PROMPT
-    
-    if retry_feedback:
-        prompt += f"\n\n**CRITICAL CORRECTION REQUIRED:** Your previous attempt failed validation with the following error: '{retry_feedback}'. You MUST fix this specific error in your response."
+    if not retry_feedback:
+        return USER_PROMPT
     
-    return prompt
\ No newline at end of file
+    return USER_PROMPT + _CORRECTION_TEMPLATE.format(feedback=retry_feedback)
\ No newline at end of file
@@ -3,11 +3,19 @@ Image Extractor Agent Tools
 Contains tools for image processing and JSON validation
 """
 
+import orjson
+from statistics import fmean
 from typing import Dict, Any, Optional, Tuple
+from src.modules.ai_agents.utils.image_data import compress_image, to_data_url
 from src.modules.ai_agents.utils.json_parser import parse_json
 from src.core.settings.logging import logger
 
 
+# Top-level sections every extraction must contain (tuple order drives the error message)
+_REQUIRED_KEYS = ("prescriber", "patient", "medications")
+_REQUIRED_KEY_SET = frozenset(_REQUIRED_KEYS)
+
+
 def validate_extraction_json(json_text: str) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
     """
     Validate extracted JSON using json_repair
@@ -19,40 +27,70 @@ def validate_extraction_json(json_text: str) -> Tuple[bool, Optional[Dict[str, A
         Tuple of (is_valid, parsed_data, error_message)
     """
     try:
-        parsed_data = parse_json(json_text)
+        # Bare JSON (the usual Gemini reply) parses directly; fenced or damaged
+        # text goes through the cleaning/repair parser
+        try:
+            parsed_data = orjson.loads(json_text)
+        except orjson.JSONDecodeError:
+            parsed_data = None
+        if not isinstance(parsed_data, dict):
+            parsed_data = parse_json(json_text)
         
         if not parsed_data:
             return False, None, "Failed to parse JSON"
         
         # Basic structure validation
-        required_keys = ["prescriber", "patient", "medications"]
-        for key in required_keys:
-            if key not in parsed_data:
-                return False, None, f"Missing required key: {key}"
+        if not _REQUIRED_KEY_SET.issubset(parsed_data):
+            missing_key = next(key for key in _REQUIRED_KEYS if key not in parsed_data)
+            return False, None, f"Missing required key: {missing_key}"
         
         # Ensure medications is a list
-        if not isinstance(parsed_data.get("medications"), list):
+        medications = parsed_data["medications"]
+        if not isinstance(medications, list):
             return False, None, "Medications must be a list"
         
-        logger.info(f"Successfully validated extraction JSON with {len(parsed_data.get('medications', []))} medications")
+        logger.info("Successfully validated extraction JSON with %d medications", len(medications))
         return True, parsed_data, None
         
     except Exception as e:
-        logger.error(f"JSON validation error: {e}")
+        logger.error("JSON validation error: %s", e)
         return False, None, str(e)
 
 
-def prepare_image_data(image_base64: str) -> str:
+def prepare_image_data(image_bytes: bytes) -> str:
     """
     Prepare image data for Gemini Vision processing
     
     Args:
-        image_base64: Base64 encoded image
+        image_bytes: Raw image bytes
+        
+    Returns:
+        Formatted (compressed) image URL for Gemini
+    """
+    return to_data_url(image_bytes)
+
+
+def build_batch_request(image_bytes: bytes, prompt: str) -> Dict[str, Any]:
+    """
+    Build an inline Gemini Batch API request for one prescription image
+    
+    Args:
+        image_bytes: Raw image bytes
+        prompt: Extraction prompt
         
     Returns:
-        Formatted image URL for Gemini
+        Inlined generateContent request
     """
-    return f"data:image/jpeg;base64,{image_base64}"
+    return {
+        "contents": [{
+            "role": "user",
+            "parts": [
+                {"text": prompt},
+                {"inline_data": {"mime_type": "image/jpeg", "data": compress_image(image_bytes)}}
+            ]
+        }],
+        "config": {"temperature": 0}
+    }
 
 
 def extract_quality_metrics(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -65,34 +103,26 @@ def extract_quality_metrics(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Quality metrics dictionary
     """
+    # Look each section up once
+    prescriber = extracted_data.get("prescriber", {})
+    patient = extracted_data.get("patient", {})
+    medications = extracted_data.get("medications", [])
+    
     metrics = {
-        "has_prescriber_data": bool(extracted_data.get("prescriber", {}).get("full_name")),
-        "has_patient_data": bool(extracted_data.get("patient", {}).get("full_name")),
-        "medication_count": len(extracted_data.get("medications", [])),
+        "has_prescriber_data": bool(prescriber.get("full_name")),
+        "has_patient_data": bool(patient.get("full_name")),
+        "medication_count": len(medications),
         "has_date": bool(extracted_data.get("date_prescription_written")),
         "avg_certainty": 0
     }
     
-    # Calculate average certainty
-    certainties = []
-    
-    # Add prescriber certainty
-    prescriber_cert = extracted_data.get("prescriber", {}).get("certainty")
-    if prescriber_cert is not None:
-        certainties.append(prescriber_cert)
-    
-    # Add patient certainty
-    patient_cert = extracted_data.get("patient", {}).get("certainty")
-    if patient_cert is not None:
-        certainties.append(patient_cert)
-    
-    # Add medication certainties
-    for med in extracted_data.get("medications", []):
-        med_cert = med.get("certainty")
-        if med_cert is not None:
-            certainties.append(med_cert)
-    
+    # Average certainty over prescriber, patient and medications
+    certainties = [
+        certainty
+        for certainty in (prescriber.get("certainty"), patient.get("certainty"), *(med.get("certainty") for med in medications))
+        if certainty is not None
+    ]
     if certainties:
-        metrics["avg_certainty"] = sum(certainties) / len(certainties)
+        metrics["avg_certainty"] = fmean(certainties)
     
     return metrics
@@ -3,10 +3,22 @@ Instructions of Use Agent
 Generates accurate, structured medication instructions with RxNorm safety validation
 """
 
+import asyncio
+import copy
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+import orjson
+
 from src.core.settings.config import settings
+from src.modules.ai_agents.utils.llm_clients import (
+    GEMINI_BATCH_TERMINAL_STATES,
+    get_gemini_llm,
+    get_genai_client
+)
+from src.modules.ai_agents.utils.ttl_cache import TTLCache
 
 from .prompts import (
     get_instructions_generation_prompt,
@@ -17,7 +29,8 @@ from .tools import (
     get_rxnorm_instruction_context,
     parse_instruction_components,
     validate_instruction_safety,
-    repair_instruction_json
+    repair_instruction_json,
+    strip_accents
 )
 
 # LangFuse observability
@@ -31,6 +44,52 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Finished instruction results keyed by the normalized medication line; the model
+# runs at temperature 0, so a verbatim repeat yields the same instructions
+_instructions_cache = TTLCache(
+    maxsize=settings.instructions_cache_size,
+    ttl=settings.instructions_cache_ttl_seconds
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Basic English-to-Spanish SIG terms (without accents) for the simple translation fallback
+_SPANISH_SIG_TERMS = {
+    "take": "tome",
+    "tablet": "tableta",
+    "capsule": "capsula",
+    "by mouth": "por la boca",
+    "once daily": "una vez al dia",
+    "twice daily": "dos veces al dia",
+    "three times daily": "tres veces al dia",
+    "as needed": "segun sea necesario",
+    "for pain": "para el dolor",
+    "for infection": "para la infeccion",
+    "for": "para"
+}
+
+# Single-pass matcher over all terms (plural "s" kept, e.g. "tablets" -> "tabletas");
+# longer phrases are tried first so "for pain" wins over "for"
+_SPANISH_SIG_RE = re.compile(
+    r"\b(" + "|".join(map(re.escape, sorted(_SPANISH_SIG_TERMS, key=len, reverse=True))) + r")(s?)\b"
+)
+
+
+def _instructions_cache_key(
+    drug_name: str,
+    strength: str,
+    raw_instructions: str,
+    indication: Optional[str]
+) -> str:
+    """Build the instruction cache key from the normalized medication line"""
+    normalized = [
+        (drug_name or "").lower().strip(),
+        strength or "",
+        _WHITESPACE_RE.sub(" ", (raw_instructions or "").lower()).strip(),
+        indication
+    ]
+    return hashlib.sha256(orjson.dumps(normalized)).hexdigest()
+
 
 class InstructionsOfUseAgent:
     """Agent for generating structured medication instructions with RxNorm safety validation"""
@@ -38,15 +97,10 @@ class InstructionsOfUseAgent:
     def __init__(self):
         """Initialize the Instructions of Use Agent"""
         try:
-            # Initialize Gemini 2.5 Pro model
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-pro",
-                temperature=0,
-                max_output_tokens=4096,
-                google_api_key=settings.google_api_key
-            )
+            # Templated JSON task: a light model in JSON mode is enough
+            self.llm = get_gemini_llm(settings.instructions_model, max_output_tokens=4096, json_output=True)
             
-            logger.info("✅ Instructions of Use Agent initialized with Gemini 2.5 Pro")
+            logger.info(f"✅ Instructions of Use Agent initialized with {settings.instructions_model}")
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize Instructions of Use Agent: {e}")
@@ -72,81 +126,278 @@ class InstructionsOfUseAgent:
         Returns:
             Structured instructions with safety validation
         """
+        cache_key = _instructions_cache_key(drug_name, strength, raw_instructions, indication)
+        cached = _instructions_cache.get(cache_key)
+        if cached is not None:
+            logger.info("♻️ Reusing cached instructions for %s %s", drug_name, strength)
+            return copy.deepcopy(cached)
+        
         try:
             logger.info(f"🏥 INSTRUCTIONS AGENT: Processing {drug_name} {strength}")
             logger.info(f"📝 Raw instructions: '{raw_instructions}'")
             
-            # Step 1: Get RxNorm clinical context
-            logger.info("🔍 Step 1: Retrieving RxNorm clinical context...")
-            rxnorm_context = await get_rxnorm_instruction_context(drug_name, strength)
+            rxnorm_context, parsed_components, prompt = await self._prepare_generation(
+                drug_name, strength, raw_instructions, indication
+            )
             
-            # Step 2: Parse instruction components
-            logger.info("📋 Step 2: Parsing instruction components...")
-            parsed_components = parse_instruction_components(raw_instructions)
+            response = await self.llm.ainvoke(prompt)
             
-            # Step 3: Generate structured instructions with clinical context
-            logger.info("🏥 Step 3: Generating structured instructions...")
-            prompt = get_instructions_generation_prompt(
-                drug_name=drug_name,
-                strength=strength,
-                raw_instructions=raw_instructions,
-                rxnorm_context=rxnorm_context if rxnorm_context.get('found') else None
+            final_result = self._complete_instructions(
+                response.content, rxnorm_context, parsed_components, drug_name, strength
             )
             
-            # Add indication if provided
-            if indication:
-                prompt += f"\n\nIndication: {indication}"
+            # Callers update the returned dicts, so the cache keeps its own copy
+            if not final_result.get("error"):
+                _instructions_cache.set(cache_key, copy.deepcopy(final_result))
             
-            response = await self.llm.ainvoke(prompt)
+            logger.info(f"✅ Instructions generation complete for {drug_name}")
+            return final_result
+            
+        except Exception as e:
+            logger.error(f"❌ Instructions generation failed for {drug_name}: {e}")
+            return self._generation_failed(raw_instructions, indication, e)
+    
+    async def _prepare_generation(
+        self,
+        drug_name: str,
+        strength: str,
+        raw_instructions: str,
+        indication: Optional[str]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+        """
+        Gather the RxNorm context and build the generation prompt for one medication line
+        
+        Args:
+            drug_name: Name of the medication
+            strength: Medication strength/dosage
+            raw_instructions: Raw prescription instructions
+            indication: Purpose/indication (optional)
+            
+        Returns:
+            Tuple of (rxnorm_context, parsed_components, prompt)
+        """
+        # Step 1: Get RxNorm clinical context
+        logger.info("🔍 Step 1: Retrieving RxNorm clinical context...")
+        rxnorm_context = await get_rxnorm_instruction_context(drug_name, strength)
+        
+        # Step 2: Parse instruction components
+        logger.info("📋 Step 2: Parsing instruction components...")
+        parsed_components = parse_instruction_components(raw_instructions)
+        
+        # Step 3: Generate structured instructions with clinical context
+        logger.info("🏥 Step 3: Generating structured instructions...")
+        prompt = get_instructions_generation_prompt(
+            drug_name=drug_name,
+            strength=strength,
+            raw_instructions=raw_instructions,
+            rxnorm_context=rxnorm_context if rxnorm_context.get('found') else None
+        )
+        
+        # Add indication if provided
+        if indication:
+            prompt += f"\n\nIndication: {indication}"
+        
+        return rxnorm_context, parsed_components, prompt
+    
+    def _complete_instructions(
+        self,
+        response_text: str,
+        rxnorm_context: Dict[str, Any],
+        parsed_components: Dict[str, Any],
+        drug_name: str,
+        strength: str
+    ) -> Dict[str, Any]:
+        """
+        Turn a Gemini response into validated, finalized instruction data
+        
+        Args:
+            response_text: Raw Gemini response
+            rxnorm_context: RxNorm clinical context of the medication
+            parsed_components: Locally parsed instruction components
+            drug_name: Name of the medication
+            strength: Medication strength/dosage
             
-            # Step 4: Repair and validate JSON response
-            logger.info("🔧 Step 4: Processing and validating response...")
-            instruction_data = repair_instruction_json(response.content)
-            
-            # Step 5: Safety validation against RxNorm
-            logger.info("🛡️ Step 5: Performing safety validation...")
-            if instruction_data.get("structured_instructions") and rxnorm_context.get('found'):
-                safety_validation = validate_instruction_safety(
-                    drug_name=drug_name,
-                    structured_instructions=instruction_data["structured_instructions"],
-                    rxnorm_context=rxnorm_context
+        Returns:
+            Finalized instruction data
+        """
+        # Step 4: Repair and validate JSON response
+        logger.info("🔧 Step 4: Processing and validating response...")
+        instruction_data = repair_instruction_json(response_text)
+        
+        # Step 5: Safety validation against RxNorm
+        logger.info("🛡️ Step 5: Performing safety validation...")
+        if instruction_data.get("structured_instructions") and rxnorm_context.get('found'):
+            safety_validation = validate_instruction_safety(
+                drug_name=drug_name,
+                structured_instructions=instruction_data["structured_instructions"],
+                rxnorm_context=rxnorm_context
+            )
+            instruction_data["safety_validation"] = safety_validation
+        
+        # Step 6: Enhance with RxNorm context
+        logger.info("📊 Step 6: Adding RxNorm clinical context...")
+        instruction_data["rxnorm_context"] = rxnorm_context
+        instruction_data["parsed_components"] = parsed_components
+        
+        # Step 7: Final validation and cleanup
+        return self._finalize_instructions(instruction_data, drug_name, strength)
+    
+    def _generation_failed(self, raw_instructions: str, indication: Optional[str], error: Any) -> Dict[str, Any]:
+        """Build the fallback result for a medication line whose generation failed"""
+        return {
+            "structured_instructions": {
+                "verb": None,
+                "quantity": None,
+                "form": None,
+                "route": None,
+                "frequency": None,
+                "duration": None,
+                "indication": indication
+            },
+            "sig_english": raw_instructions,
+            "sig_spanish": raw_instructions,
+            "safety_validation": {
+                "is_safe": False,
+                "safety_concerns": [f"Processing error: {str(error)}"],
+                "rxnorm_match": False,
+                "clinical_notes": "Manual review required due to processing error"
+            },
+            "certainty": 0,
+            "error": str(error)
+        }
+    
+    async def generate_many(
+        self,
+        items: List[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate structured instructions for several medication lines concurrently
+        
+        Args:
+            items: Keyword arguments for generate_structured_instructions, one dict per line
+            concurrency: Maximum concurrent generations (defaults to settings.medication_max_concurrency)
+            
+        Returns:
+            Instruction results in the same order as items
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.medication_max_concurrency)
+        
+        async def _one(item: Dict[str, Any]) -> Dict[str, Any]:
+            # Cache hits return immediately, so they do not wait for a slot
+            cache_key = _instructions_cache_key(
+                item.get("drug_name"), item.get("strength"),
+                item.get("raw_instructions"), item.get("indication")
+            )
+            if _instructions_cache.get(cache_key) is not None:
+                return await self.generate_structured_instructions(**item)
+            async with semaphore:
+                return await self.generate_structured_instructions(**item)
+        
+        return await asyncio.gather(*(_one(item) for item in items))
+    
+    async def generate_structured_instructions_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Generate structured instructions for many medication lines through one Gemini Batch API job
+        
+        Batch jobs cost less but can take minutes to hours, so this is meant for
+        reprocessing and backfills rather than the interactive workflow.
+        
+        Args:
+            items: Keyword arguments for generate_structured_instructions, one dict per line
+            
+        Returns:
+            Instruction results in the same order as items; failed lines get the
+            same fallback result as generate_structured_instructions
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        cache_keys = [
+            _instructions_cache_key(
+                item.get("drug_name"), item.get("strength"),
+                item.get("raw_instructions"), item.get("indication")
+            )
+            for item in items
+        ]
+        
+        # Cached lines need no Gemini call
+        job_indexes = []
+        for i, cache_key in enumerate(cache_keys):
+            cached = _instructions_cache.get(cache_key)
+            if cached is not None:
+                results[i] = copy.deepcopy(cached)
+            else:
+                job_indexes.append(i)
+        
+        if not job_indexes:
+            return results
+        
+        try:
+            prepared = await asyncio.gather(*(
+                self._prepare_generation(
+                    items[i]["drug_name"], items[i].get("strength", ""),
+                    items[i]["raw_instructions"], items[i].get("indication")
                 )
-                instruction_data["safety_validation"] = safety_validation
+                for i in job_indexes
+            ))
+            
+            client = get_genai_client()
+            job = await client.aio.batches.create(
+                model=settings.instructions_model,
+                src=[
+                    {
+                        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                        "config": {
+                            "temperature": 0,
+                            "max_output_tokens": 4096,
+                            "response_mime_type": "application/json"
+                        }
+                    }
+                    for _, _, prompt in prepared
+                ],
+                config={"display_name": "instructions-generation"}
+            )
+            logger.info("Submitted Gemini batch job %s with %d medication lines", job.name, len(job_indexes))
             
-            # Step 6: Enhance with RxNorm context
-            logger.info("📊 Step 6: Adding RxNorm clinical context...")
-            instruction_data["rxnorm_context"] = rxnorm_context
-            instruction_data["parsed_components"] = parsed_components
+            while job.state.name not in GEMINI_BATCH_TERMINAL_STATES:
+                await asyncio.sleep(settings.gemini_batch_poll_seconds)
+                job = await client.aio.batches.get(name=job.name)
             
-            # Step 7: Final validation and cleanup
-            final_result = self._finalize_instructions(instruction_data, drug_name, strength)
+            if job.state.name != "JOB_STATE_SUCCEEDED":
+                raise RuntimeError(f"Gemini batch job {job.name} ended in state {job.state.name}")
             
-            logger.info(f"✅ Instructions generation complete for {drug_name}")
-            return final_result
+            responses = list((job.dest.inlined_responses if job.dest else None) or [])
             
         except Exception as e:
-            logger.error(f"❌ Instructions generation failed for {drug_name}: {e}")
-            return {
-                "structured_instructions": {
-                    "verb": None,
-                    "quantity": None,
-                    "form": None,
-                    "route": None,
-                    "frequency": None,
-                    "duration": None,
-                    "indication": indication
-                },
-                "sig_english": raw_instructions,
-                "sig_spanish": raw_instructions,
-                "safety_validation": {
-                    "is_safe": False,
-                    "safety_concerns": [f"Processing error: {str(e)}"],
-                    "rxnorm_match": False,
-                    "clinical_notes": "Manual review required due to processing error"
-                },
-                "certainty": 0,
-                "error": str(e)
-            }
+            logger.error(f"❌ Batch instructions generation failed: {e}")
+            for i in job_indexes:
+                results[i] = self._generation_failed(items[i].get("raw_instructions"), items[i].get("indication"), e)
+            return results
+        
+        if len(responses) != len(job_indexes):
+            logger.warning("Gemini batch job %s returned %d responses for %d medication lines", job.name, len(responses), len(job_indexes))
+        
+        for position, (i, (rxnorm_context, parsed_components, _)) in enumerate(zip(job_indexes, prepared)):
+            item = items[i]
+            inlined = responses[position] if position < len(responses) else None
+            try:
+                if inlined is None:
+                    raise RuntimeError("missing batch response")
+                if inlined.error or not inlined.response:
+                    raise RuntimeError(inlined.error or "empty batch response")
+                
+                result = self._complete_instructions(
+                    inlined.response.text, rxnorm_context, parsed_components,
+                    item["drug_name"], item.get("strength", "")
+                )
+                if not result.get("error"):
+                    _instructions_cache.set(cache_keys[i], copy.deepcopy(result))
+                results[i] = result
+                
+            except Exception as e:
+                logger.error(f"❌ Instructions generation failed for {item.get('drug_name')}: {e}")
+                results[i] = self._generation_failed(item.get("raw_instructions"), item.get("indication"), e)
+        
+        return results
     
     def _finalize_instructions(self, instruction_data: Dict[str, Any], drug_name: str, strength: str) -> Dict[str, Any]:
         """
@@ -183,6 +434,10 @@ class InstructionsOfUseAgent:
                     instruction_data["sig_english"]
                 )
             
+            # Enforce the no-accents rule locally rather than relying on the model
+            if isinstance(instruction_data["sig_spanish"], str):
+                instruction_data["sig_spanish"] = strip_accents(instruction_data["sig_spanish"])
+            
             # Add metadata
             instruction_data["drug_name"] = drug_name
             instruction_data["strength"] = strength
@@ -230,25 +485,9 @@ class InstructionsOfUseAgent:
     def _translate_to_spanish_simple(self, english_sig: str) -> str:
         """Simple Spanish translation fallback"""
         try:
-            # Basic translation mappings (without accents)
-            translations = {
-                "take": "tome",
-                "tablet": "tableta",
-                "capsule": "capsula",
-                "by mouth": "por la boca",
-                "once daily": "una vez al dia",
-                "twice daily": "dos veces al dia",
-                "three times daily": "tres veces al dia",
-                "as needed": "segun sea necesario",
-                "for pain": "para el dolor",
-                "for infection": "para la infeccion",
-                "for": "para"
-            }
-            
-            spanish_sig = english_sig.lower()
-            for english, spanish in translations.items():
-                spanish_sig = spanish_sig.replace(english, spanish)
-            
+            spanish_sig = _SPANISH_SIG_RE.sub(
+                lambda match: _SPANISH_SIG_TERMS[match.group(1)] + match.group(2), english_sig.lower()
+            )
             return spanish_sig.title()
             
         except Exception as e:
@@ -6,49 +6,20 @@ Contains prompts for generating accurate, structured medication instructions
 from typing import Dict, Any, Optional
 
 
-def get_instructions_generation_prompt(drug_name: str, strength: str, raw_instructions: str, rxnorm_context: Optional[Dict] = None) -> str:
-    """
-    Generate structured medication instructions with RxNorm clinical context
-    
-    Args:
-        drug_name: Name of the medication
-        strength: Medication strength/dosage
-        raw_instructions: Raw prescription instructions
-        rxnorm_context: RxNorm drug information for clinical context
-        
-    Returns:
-        Instructions generation prompt
-    """
-    rxnorm_info = ""
-    if rxnorm_context:
-        rxnorm_info = f"""
-RxNorm Clinical Context:
-- Drug: {rxnorm_context.get('drug_name', 'N/A')}
-- RxCUI: {rxnorm_context.get('concept_id', 'N/A')}
-- Typical Form: {rxnorm_context.get('dosage_form', 'Unknown')}
-- Route: {rxnorm_context.get('route', 'Unknown')}
-- Schedule: {rxnorm_context.get('drug_schedule', 'Not controlled')}
-"""
-
-    return f"""
+# Static part of the instruction generation prompt. It is identical for every
+# medication line, so it is built once and leads the prompt, where Gemini's
+# implicit context caching can reuse it across requests
+_INSTRUCTIONS_PROMPT_PREFIX = """
 You are a pharmacy intern working under a supervising pharmacist who will review all your recommendations. Generate clear, professional patient medication instructions for pharmacist review.
 
-Medication Information:
-- Drug Name: {drug_name}
-- Strength: {strength}
-- Raw Instructions: {raw_instructions}
-
-{rxnorm_info}
-
 INSTRUCTION GENERATION RULES:
 1. Write clear instructions for the patient based on the doctor's abbreviated instructions
 2. Include: verb, quantity, route of administration, and frequency/interval
 3. Use "Administer" for inhalation medications (not "Inhale by inhalation")
-4. For Spanish: NO accents on any letters
-5. For durations <21 days: include duration in instructions
-6. Use words for frequency, not numbers (except for hour intervals like "every 4 hours")
-7. Do NOT add indication recommendations into the instruction - leave for pharmacist review
-8. Make changes to improve instructions and note observations for pharmacist
+4. For durations <21 days: include duration in instructions
+5. Use words for frequency, not numbers (except for hour intervals like "every 4 hours")
+6. Do NOT add indication recommendations into the instruction - leave for pharmacist review
+7. Make changes to improve instructions and note observations for pharmacist
 
 Should always be:
 VERB + QUANTITY + FORM + ROUTE + FREQUENCY + DURATION + INDICATION
@@ -85,8 +56,8 @@ Component Guidelines:
    - "for breathing", "for allergies", "for pain"
 
 Return ONLY a JSON object:
-{{
-    "structured_instructions": {{
+{
+    "structured_instructions": {
         "verb": "action verb",
         "quantity": "amount per dose",
         "form": "medication form",
@@ -94,17 +65,17 @@ Return ONLY a JSON object:
         "frequency": "how often",
         "duration": "how long or null",
         "indication": "purpose or null"
-    }},
+    },
     "sig_english": "Complete English instruction",
-    "sig_spanish": "Complete Spanish instruction (no accents)",
-    "intern_observations": {{
+    "sig_spanish": "Complete Spanish instruction",
+    "intern_observations": {
         "changes_made": ["list of changes made to improve instructions"],
         "pharmacist_review_notes": ["observations for supervising pharmacist"],
         "rxnorm_match": true/false,
         "safety_concerns": ["safety concerns for pharmacist review"]
-    }},
+    },
     "certainty": 0-100
-}}
+}
 
 Examples:
 - "1 po bid x 7d" → "Take 1 tablet by mouth twice daily for 7 days"
@@ -112,6 +83,56 @@ Examples:
 - "T PO qd am" → "Take 1 tablet by mouth once daily in the morning"
 """
 
+# Per-line part of the instruction generation prompt
+_MEDICATION_TEMPLATE = """
+Medication Information:
+- Drug Name: {drug_name}
+- Strength: {strength}
+- Raw Instructions: {raw_instructions}
+
+{rxnorm_info}
+"""
+
+_RXNORM_CONTEXT_TEMPLATE = """
+RxNorm Clinical Context:
+- Drug: {drug_name}
+- RxCUI: {concept_id}
+- Typical Form: {dosage_form}
+- Route: {route}
+- Schedule: {drug_schedule}
+"""
+
+
+def get_instructions_generation_prompt(drug_name: str, strength: str, raw_instructions: str, rxnorm_context: Optional[Dict] = None) -> str:
+    """
+    Generate structured medication instructions with RxNorm clinical context
+    
+    Args:
+        drug_name: Name of the medication
+        strength: Medication strength/dosage
+        raw_instructions: Raw prescription instructions
+        rxnorm_context: RxNorm drug information for clinical context
+        
+    Returns:
+        Instructions generation prompt
+    """
+    rxnorm_info = ""
+    if rxnorm_context:
+        rxnorm_info = _RXNORM_CONTEXT_TEMPLATE.format(
+            drug_name=rxnorm_context.get('drug_name', 'N/A'),
+            concept_id=rxnorm_context.get('concept_id', 'N/A'),
+            dosage_form=rxnorm_context.get('dosage_form', 'Unknown'),
+            route=rxnorm_context.get('route', 'Unknown'),
+            drug_schedule=rxnorm_context.get('drug_schedule', 'Not controlled')
+        )
+
+    return _INSTRUCTIONS_PROMPT_PREFIX + _MEDICATION_TEMPLATE.format(
+        drug_name=drug_name,
+        strength=strength,
+        raw_instructions=raw_instructions,
+        rxnorm_info=rxnorm_info
+    )
+
 
 def get_rxnorm_safety_prompt(drug_name: str, instructions: str, rxnorm_data: Dict[str, Any]) -> str:
     """
@@ -5,7 +5,10 @@ Contains tools for RxNorm lookup, instruction parsing, and safety validation
 
 import json
 import logging
+import re
+from types import MappingProxyType
 from typing import Dict, Any, Optional, List
+import orjson
 from json_repair import loads as repair_json_loads
 
 # LangFuse observability
@@ -19,6 +22,18 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Fallback RxNorm context templates; callers receive a copy with drug_name filled in
+_CONTEXT_NOT_FOUND = MappingProxyType({
+    "found": False,
+    "drug_name": None,
+    "message": "No RxNorm data available"
+})
+_CONTEXT_LOOKUP_ERROR = MappingProxyType({
+    "found": False,
+    "drug_name": None,
+    "message": "RxNorm lookup error"
+})
+
 
 @observe(name="rxnorm_instruction_context", as_type="generation", capture_input=True, capture_output=True)
 async def get_rxnorm_instruction_context(drug_name: str, strength: str = None) -> Dict[str, Any]:
@@ -33,29 +48,28 @@ async def get_rxnorm_instruction_context(drug_name: str, strength: str = None) -
         RxNorm context with clinical information
     """
     try:
-        from src.core.services.neo4j.rxnorm_rag_service import rxnorm_service
+        from src.modules.ai_agents.drugs_agent.tools import lookup_rxnorm_match
         
         logger.info(f"🔍 RXNORM INSTRUCTION CONTEXT: Drug='{drug_name}', Strength='{strength}'")
         
-        # Search for drug information
-        search_results = await rxnorm_service.search_drug(drug_name, limit=3)
+        # Reuse the shared (cached) knowledge graph lookup
+        lookup = await lookup_rxnorm_match(drug_name, strength)
+        
+        if lookup is None:
+            return {**_CONTEXT_LOOKUP_ERROR, "drug_name": drug_name}
         
-        if not search_results:
+        if not lookup["match"]:
             logger.warning(f"⚠️ No RxNorm context found for {drug_name}")
-            return {
-                "found": False,
-                "drug_name": drug_name,
-                "message": "No RxNorm data available"
-            }
-        
-        # Get the best match
-        best_match = search_results[0]
+            return {**_CONTEXT_NOT_FOUND, "drug_name": drug_name}
+        
+        # Get the best match and its detailed information
+        best_match = lookup["match"]
         concept_id = best_match.get('concept_id')
+        details = lookup["details"]
         
-        # Get detailed information
-        details = {}
-        if concept_id:
-            details = await rxnorm_service.get_drug_details(concept_id)
+        # Read the fields used more than once a single time
+        rxnorm_name = best_match.get('drug_name')
+        drug_schedule = details.get('DEA_SCHEDULE')
         
         # Build comprehensive context
         context = {
@@ -65,14 +79,14 @@ async def get_rxnorm_instruction_context(drug_name: str, strength: str = None) -
             "concept_name": best_match.get('concept_name'),
             "rxcui": concept_id,
             "ndc": details.get('NDC'),
-            "drug_schedule": details.get('DEA_SCHEDULE'),
+            "drug_schedule": drug_schedule,
             "brand_name": details.get('BRAND_NAME'),
             "brand_ndc": details.get('BRAND_NDC'),
             # Infer common information for instruction context
-            "dosage_form": infer_dosage_form(drug_name, best_match.get('drug_name', '')),
-            "route": infer_administration_route(drug_name, best_match.get('drug_name', '')),
-            "typical_frequency": infer_typical_frequency(drug_name, details.get('DEA_SCHEDULE')),
-            "safety_notes": generate_safety_notes(details.get('DEA_SCHEDULE'), drug_name)
+            "dosage_form": infer_dosage_form(drug_name, rxnorm_name or ''),
+            "route": infer_administration_route(drug_name, rxnorm_name or ''),
+            "typical_frequency": infer_typical_frequency(drug_name, drug_schedule),
+            "safety_notes": generate_safety_notes(drug_schedule, drug_name)
         }
         
         logger.info(f"✅ RxNorm context found: {context['drug_name']} (RxCUI: {concept_id})")
@@ -80,50 +94,46 @@ async def get_rxnorm_instruction_context(drug_name: str, strength: str = None) -
         
     except Exception as e:
         logger.error(f"❌ RxNorm context lookup failed: {e}")
-        return {
-            "found": False,
-            "drug_name": drug_name,
-            "error": str(e),
-            "message": "RxNorm lookup error"
-        }
+        return {**_CONTEXT_LOOKUP_ERROR, "drug_name": drug_name, "error": str(e)}
+
+
+# Ordered (name keywords, value) rules for the form and route inference; the first
+# rule whose compiled alternation occurs in the drug names wins
+_DOSAGE_FORM_RULES = (
+    (re.compile("tablet|tab"), 'tablet'),
+    (re.compile("capsule|cap"), 'capsule'),
+    (re.compile("drop|solution|gtts"), 'drops'),
+    (re.compile("cream|ointment|gel|lotion"), 'topical'),
+    (re.compile("injection|injectable"), 'injection'),
+    (re.compile("patch"), 'patch'),
+)
+_ROUTE_RULES = (
+    (re.compile("oral|tablet|capsule"), 'by mouth'),
+    (re.compile("ophthalmic|eye|ocular"), 'in eye(s)'),
+    (re.compile("topical|cream|ointment"), 'to affected area'),
+    (re.compile("vaginal"), 'vaginally'),
+    (re.compile("injection|injectable"), 'by injection'),
+)
 
 
 def infer_dosage_form(original_name: str, rxnorm_name: str) -> str:
     """Infer dosage form from drug names"""
     combined = f"{original_name} {rxnorm_name}".lower()
     
-    if any(word in combined for word in ['tablet', 'tab']):
-        return 'tablet'
-    elif any(word in combined for word in ['capsule', 'cap']):
-        return 'capsule'
-    elif any(word in combined for word in ['drop', 'solution', 'gtts']):
-        return 'drops'
-    elif any(word in combined for word in ['cream', 'ointment', 'gel', 'lotion']):
-        return 'topical'
-    elif any(word in combined for word in ['injection', 'injectable']):
-        return 'injection'
-    elif any(word in combined for word in ['patch']):
-        return 'patch'
-    else:
-        return 'unknown'
+    for pattern, dosage_form in _DOSAGE_FORM_RULES:
+        if pattern.search(combined):
+            return dosage_form
+    return 'unknown'
 
 
 def infer_administration_route(original_name: str, rxnorm_name: str) -> str:
     """Infer administration route from drug names"""
     combined = f"{original_name} {rxnorm_name}".lower()
     
-    if any(word in combined for word in ['oral', 'tablet', 'capsule']):
-        return 'by mouth'
-    elif any(word in combined for word in ['ophthalmic', 'eye', 'ocular']):
-        return 'in eye(s)'
-    elif any(word in combined for word in ['topical', 'cream', 'ointment']):
-        return 'to affected area'
-    elif any(word in combined for word in ['vaginal']):
-        return 'vaginally'
-    elif any(word in combined for word in ['injection', 'injectable']):
-        return 'by injection'
-    else:
-        return 'as directed'
+    for pattern, route in _ROUTE_RULES:
+        if pattern.search(combined):
+            return route
+    return 'as directed'
 
 
 def infer_typical_frequency(drug_name: str, schedule: str) -> List[str]:
@@ -350,8 +360,11 @@ def repair_instruction_json(json_str: str) -> Dict[str, Any]:
         Repaired and validated JSON data
     """
     try:
-        # Use json_repair to fix malformed JSON
-        repaired_data = repair_json_loads(json_str)
+        # JSON-mode responses parse directly; anything else goes through json_repair
+        try:
+            repaired_data = orjson.loads(json_str)
+        except orjson.JSONDecodeError:
+            repaired_data = repair_json_loads(json_str)
         
         # Ensure required structure
         if not isinstance(repaired_data, dict):
@@ -381,3 +394,20 @@ def repair_instruction_json(json_str: str) -> Dict[str, Any]:
             "sig_spanish": None,
             "error": f"JSON repair failed: {str(e)}"
         }
+
+
+# Spanish SIGs are written without accents; maps accented letters to plain ones
+_ACCENT_STRIP = str.maketrans("áéíóúüñÁÉÍÓÚÜÑ", "aeiouunAEIOUUN")
+
+
+def strip_accents(text: str) -> str:
+    """
+    Remove Spanish accents from a SIG
+    
+    Args:
+        text: Spanish instruction text
+        
+    Returns:
+        Text without accented letters
+    """
+    return text.translate(_ACCENT_STRIP)
@@ -5,8 +5,7 @@ Validates medication instructions for safety, completeness, and clinical accurac
 
 import logging
 from typing import Dict, Any, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
-from src.core.settings.config import settings
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 
 from .prompts import (
     get_instruction_validation_prompt,
@@ -39,12 +38,7 @@ class InstructionsOfUseValidationAgent:
         """Initialize the Instructions of Use Validation Agent"""
         try:
             # Initialize Gemini 2.5 Pro model
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-pro",
-                temperature=0,
-                max_output_tokens=4096,
-                google_api_key=settings.google_api_key
-            )
+            self.llm = get_gemini_llm("gemini-2.5-pro", max_output_tokens=4096)
             
             logger.info("✅ Instructions of Use Validation Agent initialized with Gemini 2.5 Pro")
             
@@ -17,6 +17,9 @@ def get_instruction_validation_prompt(instruction_data: Dict[str, Any], rxnorm_c
     Returns:
         Instruction validation prompt
     """
+    # Only send the RxNorm fields that were actually resolved
+    rxnorm_context = {key: value for key, value in (rxnorm_context or {}).items() if value is not None}
+    
     return f"""
 You are a pharmacy intern working under a supervising pharmacist. Perform validation of patient medication instructions for pharmacist review. Your supervising pharmacist will make the final decision.
 
@@ -24,7 +27,7 @@ Instruction Data to Validate:
 {instruction_data}
 
 RxNorm Clinical Context:
-{rxnorm_context}
+{rxnorm_context or "No RxNorm data available"}
 
 Validation Tasks:
 1. CLINICAL SAFETY: Verify instructions are clinically appropriate and safe
@@ -10,6 +10,10 @@ from src.modules.ai_agents.utils.json_parser import parse_json
 from src.core.settings.logging import logger
 
 
+# Fields that count towards the patient completeness score
+_PATIENT_COMPLETENESS_FIELDS = ("full_name", "date_of_birth", "age", "facility_name", "address")
+
+
 def validate_patient_name(name: str) -> Tuple[bool, str]:
     """
     Validate patient name format
@@ -163,16 +167,9 @@ def extract_patient_quality_metrics(patient_data: Dict[str, Any]) -> Dict[str, A
     }
     
     # Calculate completeness score
-    total_fields = 5  # full_name, date_of_birth, age, facility_name, address
-    filled_fields = sum([
-        bool(patient_data.get("full_name")),
-        bool(patient_data.get("date_of_birth")),
-        bool(patient_data.get("age")),
-        bool(patient_data.get("facility_name")),
-        bool(patient_data.get("address"))
-    ])
-    
-    metrics["completeness_score"] = (filled_fields / total_fields) * 100
+    filled_fields = sum(1 for field in _PATIENT_COMPLETENESS_FIELDS if patient_data.get(field))
+    
+    metrics["completeness_score"] = (filled_fields / len(_PATIENT_COMPLETENESS_FIELDS)) * 100
     
     # Check age-DOB consistency
     if patient_data.get("age") and patient_data.get("date_of_birth"):
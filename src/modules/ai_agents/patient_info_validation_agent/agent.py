@@ -4,10 +4,9 @@ Validates patient information using Gemini 2.5 Pro
 """
 
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 
 # Optional LangFuse import
 try:
@@ -32,11 +31,7 @@ class PatientInfoValidationAgent:
     
     def __init__(self):
         """Initialize the patient validation agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
         logger.info("Patient Info Validation Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="patient_validation",as_type="generation", capture_input=True, capture_output=True)
@@ -72,12 +67,12 @@ class PatientInfoValidationAgent:
             
             logger.info(f"Patient validation results: {validation_results['summary']}")
             
-            return {
-                **state,
+            state.setdefault("quality_warnings", []).extend(validation_results["warnings"])
+            state.update({
                 "patient_data": validation_results["validated_data"],
-                "patient_validation_results": validation_results,
-                "quality_warnings": state.get("quality_warnings", []) + validation_results["warnings"]
-            }
+                "patient_validation_results": validation_results
+            })
+            return state
             
         except Exception as e:
             logger.error(f"Patient validation failed: {e}")
@@ -171,9 +166,5 @@ class PatientInfoValidationAgent:
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
         """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
@@ -3,12 +3,13 @@ Prescriber Agent
 Extracts prescriber information from prescription images using Gemini 2.5 Pro
 """
 
+import asyncio
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 
-from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.image_data import get_image_data_url
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 
 # Optional LangFuse import
 try:
@@ -27,11 +28,7 @@ class PrescriberAgent:
     
     def __init__(self):
         """Initialize the prescriber agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
         logger.info("Prescriber Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="prescriber_extraction",as_type="generation", capture_input=True, capture_output=True)
@@ -48,8 +45,9 @@ class PrescriberAgent:
         logger.info("--- AGENT: Prescriber Information Extractor ---")
         
         try:
-            image_base64 = state.get("image_base64")
-            if not image_base64:
+            # Reuse the compressed data URL built by the image extractor
+            image_url = await asyncio.to_thread(get_image_data_url, state)
+            if not image_url:
                 return self._add_warning(state, "No image data available for prescriber extraction")
             
             # Get prescriber extraction prompt
@@ -58,7 +56,7 @@ class PrescriberAgent:
             # Create message with image
             message = HumanMessage(content=[
                 {"type": "text", "text": prompt}, 
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
+                {"type": "image_url", "image_url": {"url": image_url}}
             ])
             
             logger.info("Extracting prescriber information using Gemini 2.5 Pro...")
@@ -101,9 +99,5 @@ class PrescriberAgent:
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
         """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
@@ -9,6 +9,12 @@ from src.modules.ai_agents.utils.json_parser import parse_json
 from src.core.settings.logging import logger
 
 
+# Fields that count towards the prescriber completeness score
+_PRESCRIBER_COMPLETENESS_FIELDS = (
+    "full_name", "state_license_number", "npi_number", "dea_number", "address", "contact_number"
+)
+
+
 def validate_npi_number(npi: str) -> Tuple[bool, str]:
     """
     Validate NPI number format (should be 10 digits)
@@ -158,17 +164,9 @@ def extract_prescriber_quality_metrics(prescriber_data: Dict[str, Any]) -> Dict[
     }
     
     # Calculate completeness score
-    total_fields = 6  # full_name, state_license_number, npi_number, dea_number, address, contact_number
-    filled_fields = sum([
-        bool(prescriber_data.get("full_name")),
-        bool(prescriber_data.get("state_license_number")),
-        bool(prescriber_data.get("npi_number")),
-        bool(prescriber_data.get("dea_number")),
-        bool(prescriber_data.get("address")),
-        bool(prescriber_data.get("contact_number"))
-    ])
+    filled_fields = sum(1 for field in _PRESCRIBER_COMPLETENESS_FIELDS if prescriber_data.get(field))
     
-    metrics["completeness_score"] = (filled_fields / total_fields) * 100
+    metrics["completeness_score"] = (filled_fields / len(_PRESCRIBER_COMPLETENESS_FIELDS)) * 100
     
     # Validate individual fields
     if prescriber_data.get("npi_number"):
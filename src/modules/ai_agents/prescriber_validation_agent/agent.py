@@ -4,10 +4,9 @@ Validates prescriber information using Gemini 2.5 Pro
 """
 
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 
 # Optional LangFuse import
 try:
@@ -33,11 +32,7 @@ class PrescriberValidationAgent:
     
     def __init__(self):
         """Initialize the prescriber validation agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
         logger.info("Prescriber Validation Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="prescriber_validation", as_type="generation", capture_input=True, capture_output=True)
@@ -73,12 +68,12 @@ class PrescriberValidationAgent:
             
             logger.info(f"Prescriber validation results: {validation_results['summary']}")
             
-            return {
-                **state,
+            state.setdefault("quality_warnings", []).extend(validation_results["warnings"])
+            state.update({
                 "prescriber_data": validation_results["validated_data"],
-                "prescriber_validation_results": validation_results,
-                "quality_warnings": state.get("quality_warnings", []) + validation_results["warnings"]
-            }
+                "prescriber_validation_results": validation_results
+            })
+            return state
             
         except Exception as e:
             logger.error(f"Prescriber validation failed: {e}")
@@ -162,9 +157,5 @@ class PrescriberValidationAgent:
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
         """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
\ No newline at end of file
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
\ No newline at end of file
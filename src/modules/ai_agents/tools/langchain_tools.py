@@ -5,10 +5,9 @@ Implements the exact tools from the scenario requirements
 
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from src.core.settings.config import settings
 from src.core.services.neo4j.rxnorm_rag_service import rxnorm_service
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 import json
 
 # Optional LangFuse import
@@ -20,18 +19,9 @@ except ImportError:
             return func
         return decorator
 
-# Initialize LangChain models - Use Gemini 2.5 Pro exclusively
-llm_vision = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro", 
-    temperature=0,
-    google_api_key=settings.google_api_key
-)
-
-llm_task = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro", 
-    temperature=0,
-    google_api_key=settings.google_api_key
-)
+# LangChain models - Use Gemini 2.5 Pro exclusively (one shared client, also used by the agents)
+llm_vision = get_gemini_llm("gemini-2.5-pro")
+llm_task = llm_vision
 
 @tool
 @observe(name="rxnorm_drug_lookup", as_type="generation", capture_input=True, capture_output=True)
@@ -4,10 +4,12 @@ Translates medication instructions to Spanish using Gemini 2.5 Pro
 """
 
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
+from src.modules.ai_agents.utils.ttl_cache import TTLCache
+from src.modules.ai_agents.instructions_of_use_agent.tools import strip_accents
 
 # Optional LangFuse import
 try:
@@ -21,16 +23,20 @@ except ImportError:
 from .prompts import get_spanish_translation_prompt
 
 
+# Spanish SIGs keyed by the English SIG; pharmacy SIGs repeat a lot across
+# prescriptions, so most translations skip the Gemini call
+_translation_cache = TTLCache(
+    maxsize=settings.spanish_translation_cache_size,
+    ttl=settings.spanish_translation_cache_ttl_seconds
+)
+
+
 class SpanishTranslationAgent:
     """Agent for translating medication instructions to Spanish using Gemini 2.5 Pro"""
     
     def __init__(self):
         """Initialize the Spanish translation agent with Gemini 2.5 Pro"""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro", 
-            temperature=0,
-            google_api_key=settings.google_api_key
-        )
+        self.llm = get_gemini_llm("gemini-2.5-pro")
         logger.info("Spanish Translation Agent initialized with Gemini 2.5 Pro")
     
     @observe(name="spanish_translation", as_type="generation", capture_input=True, capture_output=True)
@@ -98,11 +104,19 @@ class SpanishTranslationAgent:
         Returns:
             Spanish translation
         """
+        cached = _translation_cache.get(sig_english)
+        if cached is not None:
+            return cached
+        
         prompt = get_spanish_translation_prompt(sig_english)
         
         try:
             response = await self.llm.ainvoke(prompt)
-            return response.content.strip()
+            # Spanish SIGs carry no accents; enforced here instead of in the prompt
+            spanish_translation = strip_accents(response.content.strip())
+            if spanish_translation:
+                _translation_cache.set(sig_english, spanish_translation)
+            return spanish_translation
         except Exception as e:
             logger.error(f"Spanish translation failed: {e}")
             return ""  # Return empty if translation fails
@@ -121,9 +135,5 @@ class SpanishTranslationAgent:
     
     def _add_warning(self, state: Dict[str, Any], warning: str) -> Dict[str, Any]:
         """Add warning to state"""
-        warnings = state.get("quality_warnings", [])
-        warnings.append(warning)
-        return {
-            **state,
-            "quality_warnings": warnings
-        }
\ No newline at end of file
+        state.setdefault("quality_warnings", []).append(warning)
+        return state
\ No newline at end of file
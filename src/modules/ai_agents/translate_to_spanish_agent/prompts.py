@@ -22,7 +22,6 @@ English Instruction to Translate:
 
 TRANSLATION REQUIREMENTS:
 - Use clear, patient-friendly Spanish
-- NO ACCENTS on any letters (á→a, é→e, í→i, ó→o, ú→u, ñ→n)
 - Maintain medical accuracy
 - Use standard medical terminology
 - Ensure translation is easily understood by patients
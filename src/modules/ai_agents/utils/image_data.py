@@ -0,0 +1,144 @@
+"""
+Image Data - Prescription image handling shared by the vision agents
+Keeps the image as raw bytes in the workflow state and base64-encodes it once,
+at the Gemini boundary
+"""
+
+import base64
+import hashlib
+import io
+from typing import Any, Dict, Optional
+from PIL import Image
+
+from src.core.settings.config import settings
+from src.core.settings.logging import logger
+
+
+def compress_image(
+    image_bytes: bytes,
+    max_edge: Optional[int] = None,
+    quality: Optional[int] = None
+) -> bytes:
+    """
+    Downscale and re-encode an image as JPEG to shrink the payload sent to Gemini
+
+    Args:
+        image_bytes: Raw image bytes
+        max_edge: Longest edge in pixels (defaults to settings.image_upload_max_edge)
+        quality: JPEG quality (defaults to settings.image_upload_jpeg_quality)
+
+    Returns:
+        JPEG bytes, or the original bytes if they are already a JPEG within max_edge,
+        cannot be decoded or would not shrink
+    """
+    max_edge = max_edge or settings.image_upload_max_edge
+    quality = quality or settings.image_upload_jpeg_quality
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+
+        # Uploads already optimized to this size are sent as is; another lossy
+        # JPEG generation would only blur the handwriting for a negligible saving
+        if image.format == 'JPEG' and max(image.size) <= max_edge:
+            return image_bytes
+
+        # Flatten transparency onto white and normalize the mode for JPEG
+        if image.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        # Downscale in place, keeping the aspect ratio
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality, optimize=True)
+        compressed = buffer.getvalue()
+
+    except Exception as e:
+        logger.warning("Image compression skipped: %s", e)
+        return image_bytes
+
+    if len(compressed) >= len(image_bytes):
+        return image_bytes
+
+    logger.info("Compressed image payload from %d to %d bytes", len(image_bytes), len(compressed))
+    return compressed
+
+
+def to_data_url(image_bytes: bytes) -> str:
+    """
+    Compress an image and format it as a data URL for Gemini Vision
+
+    Args:
+        image_bytes: Raw image bytes
+
+    Returns:
+        JPEG data URL
+    """
+    return "data:image/jpeg;base64," + base64.b64encode(compress_image(image_bytes)).decode('ascii')
+
+
+def get_image_bytes(state: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Get the raw image bytes of a workflow state
+
+    Falls back to decoding image_base64 (once; the bytes are stored back in the state).
+
+    Args:
+        state: Workflow state with image_bytes or image_base64
+
+    Returns:
+        Raw image bytes, or None when the state carries no image
+    """
+    image_bytes = state.get("image_bytes")
+    if image_bytes is None and state.get("image_base64"):
+        image_bytes = base64.b64decode(state["image_base64"])
+        state["image_bytes"] = image_bytes
+    return image_bytes or None
+
+
+def get_image_hash(state: Dict[str, Any]) -> Optional[str]:
+    """
+    Get a content hash of the workflow state's image
+    
+    Hashes the raw bytes once with BLAKE2b and stores the digest in the state.
+    
+    Args:
+        state: Workflow state with image_bytes or image_base64
+    
+    Returns:
+        Hex digest, or None when the state carries no image
+    """
+    image_hash = state.get("image_hash")
+    if image_hash is None:
+        image_bytes = get_image_bytes(state)
+        if image_bytes is None:
+            return None
+        image_hash = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+        state["image_hash"] = image_hash
+    return image_hash
+
+
+def get_image_data_url(state: Dict[str, Any]) -> Optional[str]:
+    """
+    Get the compressed image data URL of a workflow state
+
+    Built once and stored in the state, so every vision agent in the workflow reuses it.
+
+    Args:
+        state: Workflow state with image_bytes or image_base64
+
+    Returns:
+        JPEG data URL, or None when the state carries no image
+    """
+    image_url = state.get("image_data_url")
+    if image_url is None:
+        image_bytes = get_image_bytes(state)
+        if image_bytes is None:
+            return None
+        image_url = to_data_url(image_bytes)
+        state["image_data_url"] = image_url
+    return image_url
@@ -4,6 +4,7 @@ Handles extraction and cleaning of JSON from LLM responses
 """
 
 import json
+import orjson
 from typing import Dict, Any, Optional, Union
 from json_repair import loads as repair_json_loads
 from src.core.settings.logging import logger
@@ -64,10 +65,10 @@ def parse_json(text: str) -> Optional[Dict[str, Any]]:
         if not cleaned_text:
             return None
         
-        # Try standard JSON parsing first
+        # Try strict (fast) JSON parsing first
         try:
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError:
+            return orjson.loads(cleaned_text)
+        except orjson.JSONDecodeError:
             # Fall back to json_repair
             return repair_json_loads(cleaned_text)
             
@@ -0,0 +1,62 @@
+"""
+LLM Clients - Shared Gemini chat model instances
+Builds each model configuration once per process so agents reuse the same client
+"""
+
+from functools import lru_cache
+from typing import Optional
+from google import genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from src.core.settings.config import settings
+
+# Gemini Batch API job states after which the job no longer changes
+GEMINI_BATCH_TERMINAL_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"
+})
+
+
+@lru_cache(maxsize=None)
+def get_gemini_llm(
+    model: str = "gemini-2.5-pro",
+    max_output_tokens: Optional[int] = None,
+    json_output: bool = False,
+    max_retries: Optional[int] = None
+) -> ChatGoogleGenerativeAI:
+    """
+    Get a shared Gemini chat model for the given configuration
+
+    Args:
+        model: Gemini model name
+        max_output_tokens: Optional cap on generated tokens
+        json_output: Constrain responses to JSON (application/json)
+        max_retries: Attempts made by the client's own retry policy (client default if omitted)
+
+    Returns:
+        Cached ChatGoogleGenerativeAI instance (temperature 0)
+    """
+    kwargs = {}
+    if max_output_tokens is not None:
+        kwargs["max_output_tokens"] = max_output_tokens
+    if json_output:
+        kwargs["response_mime_type"] = "application/json"
+    if max_retries is not None:
+        kwargs["max_retries"] = max_retries
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=0,
+        google_api_key=settings.google_api_key,
+        **kwargs
+    )
+
+
+@lru_cache(maxsize=None)
+def get_genai_client() -> genai.Client:
+    """
+    Get the shared google.genai client (used for Gemini Batch API jobs)
+
+    Returns:
+        Cached genai.Client instance
+    """
+    return genai.Client(api_key=settings.google_api_key)
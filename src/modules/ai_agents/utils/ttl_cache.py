@@ -0,0 +1,68 @@
+"""
+TTL Cache - Bounded in-process cache with time-based expiry
+Used to memoize deterministic lookups within a single worker process
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """In-memory cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of entries kept; the least recently used are evicted first
+            ttl: Seconds an entry stays valid after it was stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Get a cached value
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss or an expired entry
+
+        Returns:
+            Cached value or default
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        # Keep recently used entries away from eviction
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entries beyond maxsize
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached entry"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -103,51 +103,3 @@ def validate_workflow_configuration(config: Dict[str, Any]) -> bool:
     
     logger.info("Workflow configuration validated successfully")
     return True
-
-
-
-
-def build_production_workflow() -> PrescriptionOrchestrator:
-    """
-    Build workflow optimized for production
-    
-    Returns:
-        Production-optimized orchestrator
-    """
-    logger.info("Building production workflow")
-    
-    production_config = {
-        "max_retries": settings.max_agent_retries,
-        "enable_comprehensive_validation": True,
-        "enable_quality_assurance": True,
-        "enable_audit_logging": True
-    }
-    
-    return build_prescription_workflow(production_config)
-
-
-def validate_workflow_configuration(config: Dict[str, Any]) -> bool:
-    """
-    Validate workflow configuration
-    
-    Args:
-        config: Configuration to validate
-        
-    Returns:
-        True if configuration is valid
-    """
-    required_keys = []  # Add required configuration keys if needed
-    
-    for key in required_keys:
-        if key not in config:
-            logger.error(f"Missing required configuration key: {key}")
-            return False
-    
-    # Validate specific configuration values
-    max_retries = config.get("max_retries")
-    if max_retries is not None and (max_retries < 0 or max_retries > 10):
-        logger.error(f"Invalid max_retries value: {max_retries}")
-        return False
-    
-    logger.info("Workflow configuration validated successfully")
-    return True
\ No newline at end of file
@@ -6,21 +6,16 @@ Implements the exact scenario requirements with optimized performance
 from typing import Dict, Any
 from json_repair import loads as repair_json_loads
 from langchain_core.pydantic_v1 import ValidationError
-from langchain_google_genai import ChatGoogleGenerativeAI
 import json
 
-from src.core.settings.config import settings
 from src.core.settings.logging import logger
+from src.modules.ai_agents.utils.llm_clients import get_gemini_llm
 from src.modules.ai_agents.langchain_image_agent.agent import LangChainImageAgent
 from src.modules.ai_agents.langchain_medication_agent.agent import LangChainMedicationAgent
 from src.modules.prescriptions_management.schema import Prescription
 
 # Initialize LangChain models for validation and supervision
-llm_vision = ChatGoogleGenerativeAI(
-    model="gemini-1.5-pro-latest", 
-    temperature=0,
-    google_api_key=settings.google_api_key
-)
+llm_vision = get_gemini_llm("gemini-1.5-pro-latest")
 
 # Node functions for the streamlined workflow
 
@@ -38,6 +38,7 @@ from src.modules.ai_agents.image_extractor_agent.agent import ImageExtractorAgen
 from src.modules.ai_agents.patient_info_agent.agent import PatientInfoAgent
 from src.modules.ai_agents.prescriber_agent.agent import PrescriberAgent
 from src.modules.ai_agents.drugs_agent.agent import DrugsAgent
+from src.modules.ai_agents.drugs_agent.tools import get_rxnorm_many
 from src.modules.ai_agents.patient_info_validation_agent.agent import PatientInfoValidationAgent
 from src.modules.ai_agents.prescriber_validation_agent.agent import PrescriberValidationAgent
 from src.modules.ai_agents.drugs_validation_agent.agent import DrugsValidationAgent
@@ -52,7 +53,10 @@ import time
 
 class WorkflowState(TypedDict, total=False):
     """Streamlined workflow state"""
+    image_bytes: bytes
     image_base64: str
+    image_data_url: str
+    image_hash: str
     retry_count: int
     feedback: str
     
@@ -66,6 +70,7 @@ class WorkflowState(TypedDict, total=False):
     prescriber_data: Dict[str, Any]
     medications_to_process: list
     processed_medications: list
+    rxnorm_prefetch_results: list
     
     # Validation results
     patient_validation_results: Dict[str, Any]
@@ -133,9 +138,7 @@ class StreamlinedPrescriptionOrchestrator:
         except Exception as e:
             logger.error(f"💥 {step_name} failed: {str(e)}")
             # Add error to state and continue workflow
-            warnings = state.get("quality_warnings", [])
-            warnings.append(f"{step_name} failed: {str(e)}")
-            state["quality_warnings"] = warnings
+            state.setdefault("quality_warnings", []).append(f"{step_name} failed: {str(e)}")
             return state
     
     @observe(name="prescription_processing_complete_workflow", as_type="generation", capture_input=True, capture_output=True)
@@ -164,29 +167,46 @@ class StreamlinedPrescriptionOrchestrator:
                 logger.warning("Image extraction failed, stopping workflow")
                 return self._create_final_output(state, "Image extraction failed")
             
-            # Step 2: Patient Info Processing
-            logger.info("👤 Step 2: Patient Information Processing")
-            if state.get("patient_data"):
-                state = await self.patient_agent.process(state)
-                state = await self.patient_validator.process(state)
-            else:
-                logger.warning("No patient data found in extraction")
-            
-            # Step 3: Prescriber Info Processing
-            logger.info("👨‍⚕️ Step 3: Prescriber Information Processing")
-            if state.get("prescriber_data"):
-                state = await self.prescriber_agent.process(state)
-                state = await self.prescriber_validator.process(state)
-            else:
-                logger.warning("No prescriber data found in extraction")
-            
-            # Step 4: Medications Processing (Core)
-            logger.info("💊 Step 4: Medications Processing")
+            # Start the RxNorm lookups for the extracted medications now so they
+            # overlap with the patient and prescriber steps
+            rxnorm_prefetch = None
             if state.get("medications_to_process"):
-                state = await self.drugs_agent.process(state)
-                state = await self.drugs_validator.process(state)
-            else:
-                logger.warning("No medications found to process")
+                rxnorm_prefetch = asyncio.create_task(get_rxnorm_many(state["medications_to_process"]))
+            
+            try:
+                # Step 2: Patient Info Processing
+                logger.info("👤 Step 2: Patient Information Processing")
+                if state.get("patient_data"):
+                    state = await self.patient_agent.process(state)
+                    state = await self.patient_validator.process(state)
+                else:
+                    logger.warning("No patient data found in extraction")
+                
+                # Step 3: Prescriber Info Processing
+                logger.info("👨‍⚕️ Step 3: Prescriber Information Processing")
+                if state.get("prescriber_data"):
+                    state = await self.prescriber_agent.process(state)
+                    state = await self.prescriber_validator.process(state)
+                else:
+                    logger.warning("No prescriber data found in extraction")
+                
+                # Step 4: Medications Processing (Core)
+                logger.info("💊 Step 4: Medications Processing")
+                if state.get("medications_to_process"):
+                    if rxnorm_prefetch is not None:
+                        state["rxnorm_prefetch_results"] = await rxnorm_prefetch
+                    state = await self.drugs_agent.process(state)
+                    state = await self.drugs_validator.process(state)
+                else:
+                    logger.warning("No medications found to process")
+            finally:
+                # Never leave the prefetch running (or its error unretrieved) when the
+                # steps above raise or the drugs step is skipped
+                if rxnorm_prefetch is not None:
+                    if not rxnorm_prefetch.done():
+                        rxnorm_prefetch.cancel()
+                    elif not rxnorm_prefetch.cancelled():
+                        rxnorm_prefetch.exception()
             
             # Step 5: Clinical Safety Review (NEW)
             logger.info("🛡️ Step 5: Clinical Safety Review")
@@ -266,11 +286,11 @@ class StreamlinedPrescriptionOrchestrator:
             
         except Exception as e:
             logger.error(f"Failed to create final output: {e}")
+            state.setdefault("quality_warnings", []).append(f"Final assembly failed: {str(e)}")
             return {
                 **state,
                 "final_json_output": "{}",
-                "processing_status": "failed",
-                "quality_warnings": state.get("quality_warnings", []) + [f"Final assembly failed: {str(e)}"]
+                "processing_status": "failed"
             }
     
     async def invoke(self, initial_state: Dict[str, Any]) -> Dict[str, Any]:
@@ -7,7 +7,6 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, Optional
 import uuid
-import base64
 import os
 from PIL import Image
 import io
@@ -76,12 +75,10 @@ async def upload_and_process_prescription(
         # Optimize image
         optimized_image_data = processing_service.optimize_image(file_data)
         
-        # Convert to base64
-        image_base64 = base64.b64encode(optimized_image_data).decode('utf-8')
-        
-        # Process prescription with AI agents
+        # Process prescription with AI agents (the image is base64-encoded only
+        # where it is sent to Gemini)
         result = await processing_service.process_prescription_image(
-            image_base64=image_base64,
+            image_bytes=optimized_image_data,
             request_metadata={
                 "filename": file.filename,
                 "file_size": len(file_data),
@@ -34,15 +34,17 @@ class PrescriptionProcessingService:
     
     async def process_prescription_image(
         self,
-        image_base64: str,
-        request_metadata: Optional[Dict[str, Any]] = None
+        image_base64: Optional[str] = None,
+        request_metadata: Optional[Dict[str, Any]] = None,
+        image_bytes: Optional[bytes] = None
     ) -> Dict[str, Any]:
         """
         Process a prescription image using the complete AI agent workflow.
         
         Args:
-            image_base64: Base64 encoded prescription image
+            image_base64: Base64 encoded prescription image (used when image_bytes is not given)
             request_metadata: Optional request metadata
+            image_bytes: Raw prescription image bytes
             
         Returns:
             Processing result with extracted prescription data
@@ -56,6 +58,7 @@ class PrescriptionProcessingService:
         try:
             # Create initial workflow state
             initial_state = {
+                "image_bytes": image_bytes,
                 "image_base64": image_base64,
                 "retry_count": 0,
                 "feedback": None,
@@ -188,14 +191,15 @@ class PrescriptionProcessingService:
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            # Resize if too large (max 2048x2048)
-            max_size = 2048
+            # Resize if too large (same limit as the Gemini upload path, which then
+            # leaves the image as is)
+            max_size = settings.image_upload_max_edge
             if image.width > max_size or image.height > max_size:
                 image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
             
             # Save optimized image
             output_buffer = io.BytesIO()
-            image.save(output_buffer, format='JPEG', quality=85, optimize=True)
+            image.save(output_buffer, format='JPEG', quality=settings.image_upload_jpeg_quality, optimize=True)
             
             return output_buffer.getvalue()
             
@@ -9,6 +9,7 @@ from datetime import datetime
 from src.core.settings.logging import logger
 from src.core.services.gemini.gemini import gemini_service
 from src.core.services.neo4j.rxnorm_rag_service import rxnorm_service
+from src.modules.ai_agents.drugs_agent.tools import get_rxnorm_cache_stats
 from src.core.settings.observability import AuditLogger
 
 
@@ -28,6 +29,18 @@ class SystemHealthChecker:
             Comprehensive health report
         """
         return await self.check_all_services()
+    
+    async def handle_cache_stats(self) -> Dict[str, Any]:
+        """
+        Handle RxNorm cache statistics request
+        
+        Returns:
+            RxNorm lookup cache statistics
+        """
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "rxnorm_cache": get_rxnorm_cache_stats()
+        }
       
     async def _is_gemini_ready(self) -> bool:
         """Check if Gemini service is ready"""
@@ -31,3 +31,20 @@ async def comprehensive_health_check(
         Complete system health report including all services
     """
     return await handler.handle_comprehensive_health_check()
+
+
+@router.get(
+    "/cache-stats",
+    summary="RxNorm cache statistics",
+    description="Get hit/miss statistics of the RxNorm lookup cache for this worker"
+)
+async def rxnorm_cache_stats(
+    handler: SystemHealthChecker = Depends(get_health_handler)
+) -> Dict[str, Any]:
+    """
+    RxNorm cache statistics endpoint
+    
+    Returns:
+        Cache hit/miss counters and configuration
+    """
+    return await handler.handle_cache_stats()